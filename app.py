@@ -4,26 +4,126 @@ Main integrated smart home application
 Combines room lights, bedroom automation, chatbot, and web interface
 """
 
-from flask import Flask, render_template, request, jsonify
-from flask_socketio import SocketIO
-import eventlet
-eventlet.monkey_patch()
+from config.settings import HOST, PORT, DEBUG, SECRET_KEY, ASYNC_MODE
+
+# Monkey-patch before anything else imports socket/threading (only once, so
+# re-importing this module, e.g. under a preloading server, is harmless)
+if ASYNC_MODE == 'eventlet':
+    import eventlet
+    if not eventlet.patcher.is_monkey_patched('socket'):
+        eventlet.monkey_patch()
+    from eventlet import tpool
+elif ASYNC_MODE == 'gevent':
+    from gevent import monkey
+    if not monkey.is_module_patched('socket'):
+        monkey.patch_all()
+
+import json
+from collections import deque
+
+from flask import Flask, Response, render_template, request
+from flask_socketio import SocketIO, emit
+
+# Optional gzip compression of HTTP responses
+try:
+    from flask_compress import Compress
+except ImportError:
+    Compress = None
+
+# Use orjson for HTTP and Socket.IO payloads when available
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+if orjson:
+    class _OrjsonCodec:
+        """json-module lookalike for python-socketio backed by orjson"""
+        @staticmethod
+        def dumps(obj, **kwargs):
+            return orjson.dumps(obj).decode()
+
+        @staticmethod
+        def loads(s, **kwargs):
+            return orjson.loads(s)
+
+    json_codec = _OrjsonCodec
+else:
+    json_codec = json
 
 # Import our modules
 from hardware.room_lights import RoomLightsController
 from hardware.bedroom_automation import BedroomAutomation
 from chatbot.light_chatbot import LightChatbot
-from config.settings import HOST, PORT, DEBUG, SECRET_KEY
 
 app = Flask(__name__)
 app.config['SECRET_KEY'] = SECRET_KEY
-socketio = SocketIO(app, async_mode='eventlet', cors_allowed_origins="*")
+if Compress:
+    app.config['COMPRESS_ALGORITHM'] = 'gzip'
+    app.config['COMPRESS_MIN_SIZE'] = 200  # tiny JSON replies aren't worth compressing
+    Compress(app)
+socketio = SocketIO(app, async_mode=ASYNC_MODE, cors_allowed_origins="*", json=json_codec)
+
+def fast_json(obj, status=200):
+    """jsonify() replacement that serializes with orjson when it is installed"""
+    return Response(json_codec.dumps(obj), status=status, mimetype='application/json')
 
 # Global components
 lights_controller = None
 bedroom_automation = None
 chatbot = None
 
+# Cached light-state snapshot, rebuilt only when the controller's state_version moves
+_snapshot_cache = {'version': None, 'states': None, 'json': None}
+
+def get_lights_snapshot():
+    """Return (states_dict, states_json), rebuilding them only after a light change"""
+    version = lights_controller.state_version
+    if _snapshot_cache['version'] != version:
+        states = lights_controller.get_all_states()
+        _snapshot_cache['states'] = states
+        _snapshot_cache['json'] = json_codec.dumps(states)
+        _snapshot_cache['version'] = version
+    return _snapshot_cache['states'], _snapshot_cache['json']
+
+def broadcast(event, data):
+    """Emit an event to every connected client (encoded once), then yield to other tasks"""
+    socketio.emit(event, data)
+    socketio.sleep(0)
+
+# Light changes are coalesced for a short window and broadcast together
+LIGHT_BATCH_WINDOW = 0.02  # seconds
+# deque append/popleft are atomic, so changes can be queued from any thread
+# (including tpool workers) without a green lock
+_pending_changes = deque()
+
+def queue_light_change(room, state, source):
+    """Record a light change; the flusher broadcasts it with any others in the window"""
+    _pending_changes.append({'room': room, 'state': state, 'source': source})
+
+def flush_light_changes():
+    """Broadcast pending changes: one light_changed, or a single lights_batch for bursts"""
+    latest = {}
+    while _pending_changes:
+        change = _pending_changes.popleft()
+        latest[change['room']] = change
+    if not latest:
+        return
+    changes = list(latest.values())
+    if len(changes) == 1:
+        broadcast('light_changed', changes[0])
+    else:
+        broadcast('lights_batch', {'changes': changes})
+
+def _light_change_flusher():
+    """Background task that drains queued light changes every batch window"""
+    while True:
+        socketio.sleep(LIGHT_BATCH_WINDOW)
+        try:
+            flush_light_changes()
+        except Exception as e:
+            print(f"❌ Error broadcasting light changes: {e}")
+
 def initialize_components():
     """Initialize all system components"""
     global lights_controller, bedroom_automation, chatbot
@@ -34,8 +134,10 @@ def initialize_components():
     lights_controller = RoomLightsController(
         double_click_time=0.4, 
         hold_time=1.0, 
-        socketio=socketio  # Pass socketio instance for real-time updates
+        socketio=socketio,  # Pass socketio instance for real-time updates
+        on_change=queue_light_change  # Coalesce bursts of changes into one broadcast
     )
+    socketio.start_background_task(_light_change_flusher)
     print("✓ Room lights controller ready (pigpio backend)")
     
     # 2. Initialize bedroom automation
@@ -49,6 +151,15 @@ def initialize_components():
     
     print("🎉 All systems ready!")
 
+def run_blocking(func, *args, **kwargs):
+    """Run a blocking hardware call in a native worker thread so the hub keeps serving"""
+    if ASYNC_MODE == 'eventlet':
+        return tpool.execute(func, *args, **kwargs)
+    if ASYNC_MODE == 'gevent':
+        import gevent
+        return gevent.get_hub().threadpool.apply(func, args, kwargs)
+    return func(*args, **kwargs)
+
 # Web Routes
 @app.route('/')
 def index():
@@ -63,32 +174,31 @@ def control_light(room, state):
     if room == 'all':
         new_state = state == 'on'
         # Use controller's 'all' handling
-        lights_controller.set_light('all', new_state, source='web')
-        return jsonify({'room': 'all', 'state': new_state})
+        run_blocking(lights_controller.set_light, 'all', new_state, source='web')
+        return fast_json({'room': 'all', 'state': new_state})
 
     # normal per-room control
     if room not in lights_controller.leds:
-        return jsonify({'error': 'Room not found'}), 404
+        return fast_json({'error': 'Room not found'}, 404)
 
     new_state = state == 'on'
-    lights_controller.set_light(room, new_state, source='web')
-    return jsonify({'room': room, 'state': new_state})
+    run_blocking(lights_controller.set_light, room, new_state, source='web')
+    return fast_json({'room': room, 'state': new_state})
 
 
 @app.route('/api/lights/status', methods=['GET'])
 def get_all_light_status():
     """Get status of all lights"""
-    status = {}
-    for room in lights_controller.leds:
-        status[room] = lights_controller.get_light_state(room)
-    return jsonify(status)
+    _, status_json = get_lights_snapshot()
+    return Response(status_json, mimetype='application/json')
 
 @app.route('/api/chat', methods=['POST'])
 def chat_endpoint():
     """API endpoint for chatbot"""
-    message = request.json.get('message', '')
+    data = request.get_json(silent=True, cache=True) or {}
+    message = data.get('message', '')
     response = chatbot.process_message(message)
-    return jsonify({'response': response})
+    return fast_json({'response': response})
 
 # route to receive Rhasspy intent webhooks
 @app.route('/api/rhasspy', methods=['POST'])
@@ -101,24 +211,22 @@ def rhasspy_intent_webhook():
     try:
         # call internal handler from your chatbot instance
         resp_text = chatbot._handle_intent_json(data)  # internal but fine to call here
-        return jsonify({'response': resp_text})
+        return fast_json({'response': resp_text})
     except Exception as e:
         # don't crash Rhasspy — return an error JSON
-        return jsonify({'error': str(e)}), 500
+        return fast_json({'error': str(e)}, 500)
 
 
 # WebSocket Events
 @socketio.on('connect')
 def handle_connect():
     print('Client connected')
-    # Send current light states to newly connected client
-    for room in lights_controller.leds:
-        state = lights_controller.get_light_state(room)
-        socketio.emit('light_changed', {
-            'room': room, 
-            'state': state,
-            'source': 'system'
-        })
+    # Send current light states to the newly connected client only, in a single frame
+    snapshot, _ = get_lights_snapshot()
+    emit('lights_snapshot', {
+        'states': snapshot,
+        'source': 'system'
+    })
 
 @socketio.on('disconnect')
 def handle_disconnect():
@@ -130,6 +238,7 @@ def cleanup_system():
     
     if bedroom_automation:
         bedroom_automation.stop()
+        bedroom_automation.cleanup()
     
     if lights_controller:
         lights_controller.cleanup()
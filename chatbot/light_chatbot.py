@@ -12,25 +12,51 @@ import os
 import sys
 import json
 import difflib
-import traceback
+import logging
 import re
+import time
+from collections import deque
 from datetime import datetime
-from typing import Optional, Dict, Any, List
+from functools import lru_cache
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Optional, Dict, Any, List, Deque, Sequence
 
-# Add project root to path (so imports work when run as module)
-sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# Add project root to path (so imports work when run as module); only once,
+# so re-imports under a reloader don't keep growing sys.path
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if PROJECT_ROOT not in sys.path:
+    sys.path.append(PROJECT_ROOT)
 
+# requests is only needed when Rhasspy is configured; see _get_requests()
+requests = None
+
+# Optional: orjson for parsing/printing Rhasspy payloads, else stdlib json
 try:
-    import requests
-except Exception:
-    requests = None
+    import orjson
+
+    json_loads = orjson.loads
 
-# Try to import the hardware controller if available
+    def json_dumps(obj) -> str:
+        return orjson.dumps(obj).decode()
+except ImportError:
+    json_loads = json.loads
+
+    def json_dumps(obj) -> str:
+        return json.dumps(obj, ensure_ascii=False)
+
+# Optional: Aho-Corasick automaton for finding room names in text in one pass
 try:
-    from hardware.room_lights import RoomLightsController
-    HARDWARE_AVAILABLE = True
-except Exception:
-    HARDWARE_AVAILABLE = False
+    import ahocorasick
+except ImportError:
+    ahocorasick = None
+
+# Optional: rapidfuzz (C++) for fuzzy room/state matching, else difflib
+try:
+    from rapidfuzz import fuzz, process as fuzz_process
+except ImportError:
+    fuzz = fuzz_process = None
+
+logger = logging.getLogger(__name__)
 
 # Try to read RHASSPY_URL from config.settings or environment
 RHASSPY_URL = None
@@ -46,6 +72,12 @@ RHASSPY_URL = os.environ.get('RHASSPY_URL', RHASSPY_URL)
 # Default Rhasspy endpoint path for text-to-intent
 RHASSPY_TEXT2INTENT_PATH = '/api/text-to-intent'
 
+# Concurrent Rhasspy requests when processing a batch of messages
+RHASSPY_BATCH_WORKERS = 8
+
+# Number of conversation turns kept in memory
+HISTORY_MAXLEN = 200
+
 # Default room synonyms (used for fuzzy mapping only)
 DEFAULT_ROOM_MAPPINGS = {
     'hall': ['hall', 'living room', 'living', 'lounge', 'sitting room', 'main room'],
@@ -54,6 +86,80 @@ DEFAULT_ROOM_MAPPINGS = {
     'bathroom': ['bathroom', 'bath room', 'restroom', 'toilet', 'washroom', 'wc'],
 }
 
+# Words that mean "every room" (as a slot value / as a room name passed to _map_room)
+ALL_SLOT_WORDS = frozenset(('all', 'every', 'entire', 'everything', 'whole'))
+ALL_ROOM_WORDS = frozenset(('all', 'every', 'entire', 'everything', 'house'))
+
+# Light states understood in free text
+STATE_WORDS = ('on', 'off', 'toggle')
+STATE_WORD_SET = frozenset(STATE_WORDS)
+
+# Words the local parser maps to an action, and which action wins on a tie
+VERB_WORDS = {
+    'on': 'on', 'enable': 'on',
+    'off': 'off', 'disable': 'off',
+    'toggle': 'toggle',
+    'status': 'status', 'is': 'status', 'are': 'status', 'state': 'status',
+}
+VERB_PRIORITY = ('on', 'off', 'toggle', 'status')
+
+# Slot names that may carry the requested state / room, in priority order
+STATE_SLOT_NAMES = ('state', 'switch', 'power', 'action')
+ROOM_SLOT_NAMES = ('room', 'location', 'area', 'place')
+
+# Minimum similarity (0-1) for a fuzzy room/state match
+FUZZY_CUTOFF = 0.6
+
+# Patterns applied to every message, compiled once
+ALL_RE = re.compile(r'\b(?:all|every|entire|whole|everything)\b')
+EXCEPT_RE = re.compile(r'except (?:the )?([a-zA-Z ]+)')
+TOKEN_RE = re.compile(r'[a-z]+')
+
+# Substrings of an intent name that mark it as a query / status check
+QUERY_INTENT_WORDS = ('status', 'check', 'query', 'which', 'what', 'are', 'is')
+STATUS_INTENT_WORDS = ('status', 'check', 'is', 'are')
+
+# Static usage hints returned when a message can't be acted on
+EMPTY_MESSAGE_REPLY = "Please type a command, for example: 'turn on kitchen light'."
+UNPARSEABLE_REPLY = "Sorry — I couldn't understand that. Try: 'turn on kitchen light'"
+UNKNOWN_COMMAND_REPLY = "I couldn't understand the command. Examples: 'turn on kitchen light'"
+ALL_LIGHTS_HINT_REPLY = "Try 'turn on all lights' or 'turn off all lights'."
+
+
+def _get_requests():
+    """Import requests on first use; returns the module, or None if it isn't installed."""
+    global requests
+    if requests is None:
+        try:
+            import requests as requests_module
+        except Exception:
+            return None
+        requests = requests_module
+    return requests
+
+
+def _close_match(word: str, choices: Sequence[str]) -> Optional[str]:
+    """Return the choice most similar to word, or None below FUZZY_CUTOFF.
+
+    The answer is always difflib's (best ratio, ties to the larger string).
+    rapidfuzz, when installed, only prefilters: its LCS-based ratio is never
+    below difflib's, so choices it rejects could not have matched anyway.
+    """
+    if fuzz_process is not None:
+        # small slack so float rounding at exactly the cutoff can't drop a match
+        hits = fuzz_process.extract(word, choices, scorer=fuzz.ratio,
+                                    score_cutoff=FUZZY_CUTOFF * 100 - 1e-6, limit=None)
+        if not hits:
+            return None
+        choices = [hit[0] for hit in hits]
+    match = difflib.get_close_matches(word, choices, n=1, cutoff=FUZZY_CUTOFF)
+    return match[0] if match else None
+
+
+def _is_word_char(c: str) -> bool:
+    """True for characters regex \\w treats as part of a word."""
+    return c.isalnum() or c == '_'
+
 
 class LightChatbot:
     """Light chatbot that delegates NLU to Rhasspy (Snips) when available."""
@@ -62,8 +168,26 @@ class LightChatbot:
         # Use provided lights controller, or create simple simulator
         self.lights = lights_controller or self._create_simulator()
 
-        # Conversation history (keeps last 200 entries)
-        self.conversation_history: List[Dict[str, Any]] = []
+        # Probe controller capabilities once and keep bound methods, instead of
+        # hasattr() chains on every action
+        self._set_light = getattr(self.lights, 'set_light', None)
+        self._toggle_light = getattr(self.lights, 'toggle_light', None)
+        self._get_light_state = getattr(self.lights, 'get_light_state', None)
+        self._all_lights_on = getattr(self.lights, 'all_lights_on', None)
+        self._all_lights_off = getattr(self.lights, 'all_lights_off', None)
+        self._controller_get_all_states = getattr(self.lights, 'get_all_states', None)
+        leds = getattr(self.lights, 'leds', None)
+        self._leds = leds if isinstance(leds, dict) else None
+        states = getattr(self.lights, 'states', None)
+        self._states = states if isinstance(states, dict) else None
+
+        # Bulk state reader, falling back to per-room reads
+        self._get_all_states = self._controller_get_all_states or (
+            lambda: {r: self._get_light_state(r) for r in self.room_mappings.keys()}
+        )
+
+        # Conversation history (keeps last HISTORY_MAXLEN entries; oldest dropped in O(1))
+        self.conversation_history: Deque[Dict[str, Any]] = deque(maxlen=HISTORY_MAXLEN)
 
         # Room mapping (canonical -> synonyms). If lights controller exposes
         # available rooms, use that to narrow candidates.
@@ -76,24 +200,37 @@ class LightChatbot:
             self.rhasspy_url = self.rhasspy_url[:-1]
 
         # Decide whether we have requests available
-        self._have_requests = requests is not None
+        self._have_requests = bool(self.rhasspy_url) and _get_requests() is not None
+
+        # One pooled keep-alive session and a preformatted endpoint for Rhasspy calls
+        self._rhasspy_full_url = f"{self.rhasspy_url}{RHASSPY_TEXT2INTENT_PATH}" if self.rhasspy_url else None
+        self._session = None
+        if self._have_requests and self.rhasspy_url:
+            self._session = requests.Session()
+            adapter = requests.adapters.HTTPAdapter(pool_connections=4, pool_maxsize=16)
+            self._session.mount('http://', adapter)
+            self._session.mount('https://', adapter)
 
         # Initialization message
-        mode = "Hardware" if HARDWARE_AVAILABLE else "Simulation"
+        mode = "Hardware" if lights_controller is not None else "Simulation"
         nlu_mode = f"Rhasspy @ {self.rhasspy_url}" if self.rhasspy_url else "Local fallback (no NLU)"
         print(f"🤖 LightChatbot initialized ({mode} mode). NLU: {nlu_mode}")
 
     def _refresh_rooms_from_controller(self):
         """If controller exposes leds or states, derive canonical room names."""
+        self._cached_room_keys = ()
+        self._controller_rooms = frozenset()
         try:
-            if hasattr(self.lights, 'leds') and isinstance(self.lights.leds, dict):
-                controller_rooms = list(self.lights.leds.keys())
-            elif hasattr(self.lights, 'states') and isinstance(self.lights.states, dict):
-                controller_rooms = list(self.lights.states.keys())
-            elif hasattr(self.lights, 'get_all_states'):
-                controller_rooms = list(self.lights.get_all_states().keys())
+            if self._leds is not None:
+                controller_rooms = list(self._leds.keys())
+            elif self._states is not None:
+                controller_rooms = list(self._states.keys())
+            elif self._controller_get_all_states:
+                controller_rooms = list(self._controller_get_all_states().keys())
             else:
                 controller_rooms = []
+            self._cached_room_keys = tuple(controller_rooms)
+            self._controller_rooms = frozenset(controller_rooms)
 
             for room in controller_rooms:
                 room = room.lower()
@@ -101,6 +238,58 @@ class LightChatbot:
                     self.room_mappings[room] = [room]
         except Exception:
             pass
+        self._index_rooms()
+
+    def invalidate_controller_cache(self):
+        """Re-read the controller's rooms after lights were added or removed."""
+        self._refresh_rooms_from_controller()
+
+    def _index_rooms(self):
+        """Precompute room lookup structures whenever the room set changes."""
+        # one whole-word alternation over every room name and synonym, with a
+        # named group per room, so a single search finds the first room mentioned
+        self._room_groups = {}
+        alternatives = []
+        for i, (canonical, synonyms) in enumerate(self.room_mappings.items()):
+            group = f'r{i}'
+            self._room_groups[group] = canonical
+            words = '|'.join(re.escape(w) for w in [canonical] + list(synonyms))
+            alternatives.append(f'(?P<{group}>{words})')
+        self._room_re = re.compile(r'\b(?:' + '|'.join(alternatives) + r')\b')
+        # same vocabulary as an Aho-Corasick automaton when pyahocorasick is installed
+        self._room_automaton = None
+        if ahocorasick is not None:
+            automaton = ahocorasick.Automaton()
+            for i, (canonical, synonyms) in enumerate(self.room_mappings.items()):
+                for word in [canonical] + list(synonyms):
+                    if word not in automaton:  # first mapping wins, as in the regex
+                        automaton.add_word(word, (i, len(word), canonical))
+            automaton.make_automaton()
+            self._room_automaton = automaton
+        # per-room vocabulary for the local parser: single words are matched
+        # against the message's token set, multi-word synonyms as phrases
+        self._room_vocab = []
+        for canonical, synonyms in self.room_mappings.items():
+            words = [canonical] + list(synonyms)
+            self._room_vocab.append((
+                canonical,
+                frozenset(w for w in words if ' ' not in w),
+                tuple(w for w in words if ' ' in w),
+            ))
+        # reverse index: synonym -> canonical (first mapping wins, as in the scan order)
+        # plus the flat candidate list used for fuzzy matching in _map_room
+        self._synonym_to_room = {}
+        self._room_candidates = []
+        # flat (synonym, canonical) pairs, in mapping order, for the substring scan
+        self._synonym_pairs = []
+        for canonical, synonyms in self.room_mappings.items():
+            self._room_candidates.append(canonical)
+            self._room_candidates.extend(synonyms)
+            self._synonym_pairs.extend((syn, canonical) for syn in synonyms)
+            for word in [canonical] + list(synonyms):
+                self._synonym_to_room.setdefault(word, canonical)
+        # memoized _map_room lookups; a fresh cache per room set drops stale entries
+        self._cached_lookup_room = lru_cache(maxsize=1024)(self._lookup_room)
 
     def _create_simulator(self):
         class LightSimulator:
@@ -137,8 +326,25 @@ class LightChatbot:
     # ---------------- Public API ----------------
     def process_message(self, message: str) -> str:
         """Main entrypoint: takes plain text and returns a user-facing response."""
+        return self._process_message(message)
+
+    def process_messages(self, messages: Sequence[str]) -> List[str]:
+        """Process several messages in order, fetching their Rhasspy intents concurrently."""
+        if not (self.rhasspy_url and self._have_requests):
+            return [self._process_message(m) for m in messages]
+        with ThreadPoolExecutor(max_workers=RHASSPY_BATCH_WORKERS) as pool:
+            futures = [
+                # 'all' commands are normally answered locally, so don't ask Rhasspy up front
+                pool.submit(self._text_to_intent_rhasspy, m.strip())
+                if m and m.strip() and not ALL_RE.search(m.lower()) else None
+                for m in messages
+            ]
+            # actions and history stay sequential, in the order messages were given
+            return [self._process_message(m, f) for m, f in zip(messages, futures)]
+
+    def _process_message(self, message: str, intent_future: Optional[Future] = None) -> str:
         if not message or not message.strip():
-            return "Please type a command, for example: 'turn on kitchen light'."
+            return EMPTY_MESSAGE_REPLY
 
         user_text = message.strip()
         self._append_history(user_text, None)
@@ -146,15 +352,16 @@ class LightChatbot:
         # ------------------ HOTFIX: handle "all" commands locally ------------------
         # Prevent 'all' -> 'hall' confusion by short-circuiting 'all' requests.
         lower = user_text.lower()
-        if re.search(r'\b(all|every|entire|whole|everything)\b', lower):
+        tokens = TOKEN_RE.findall(lower)
+        if not ALL_SLOT_WORDS.isdisjoint(tokens):
             exc_room = None
-            m = re.search(r'except (the )?([a-zA-Z ]+)', lower)
+            m = EXCEPT_RE.search(lower)
             if m:
-                exc_room_text = m.group(2).strip()
-                exc_room = self._map_room(exc_room_text)
+                exc_room_text = m.group(1).strip()
+                exc_room = self._map_room(exc_room_text, already_lower=True)
 
             # detect state word (on/off/toggle) from text (typo tolerant)
-            state = self._extract_state_from_text(lower)
+            state = self._extract_state_from_text(lower, tokens)
             if not state:
                 # If Rhasspy is configured, let it resolve ambiguous all-commands.
                 if not (self.rhasspy_url and self._have_requests):
@@ -179,32 +386,44 @@ class LightChatbot:
                     return resp
         # ---------------- end HOTFIX ------------------------------------------------
 
-        # Try NLU if configured
-        if self.rhasspy_url and self._have_requests:
+        # Try NLU if configured (or already fetched by the caller)
+        if intent_future is not None or (self.rhasspy_url and self._have_requests):
             try:
-                intent_json = self._text_to_intent_rhasspy(user_text)
+                if intent_future is not None:
+                    intent_json = intent_future.result()
+                else:
+                    intent_json = self._text_to_intent_rhasspy(user_text)
                 if intent_json:
                     response = self._handle_intent_json(intent_json)
                     self._update_last_history_response(response)
                     return response
             except Exception:
-                traceback.print_exc()
+                logger.exception("Rhasspy NLU failed; falling back to the local parser")
 
         # Fallback local parsing
         try:
-            response = self._local_fallback_parse(user_text)
+            response = self._local_fallback_parse(lower, already_lower=True)
             self._update_last_history_response(response)
             return response
         except Exception:
-            traceback.print_exc()
-            response = "Sorry — I couldn't understand that. Try: 'turn on kitchen light'"
+            logger.exception("Local parser failed on %r", user_text)
+            response = UNPARSEABLE_REPLY
             self._update_last_history_response(response)
             return response
 
     def get_conversation_history(self) -> List[Dict[str, Any]]:
-        return list(self.conversation_history)
+        # timestamps are stored as epoch nanoseconds; format them only when read
+        return [
+            dict(entry, timestamp=datetime.utcfromtimestamp(entry['timestamp'] / 1e9).isoformat() + 'Z')
+            for entry in self.conversation_history
+        ]
 
     def cleanup(self):
+        try:
+            if self._session is not None:
+                self._session.close()
+        except Exception:
+            pass
         try:
             if hasattr(self.lights, 'cleanup'):
                 self.lights.cleanup()
@@ -214,11 +433,10 @@ class LightChatbot:
     # ---------------- Helpers: history ----------------
     def _append_history(self, user_text: str, response: Optional[str]):
         self.conversation_history.append({
-            'timestamp': datetime.utcnow().isoformat() + 'Z',
+            'timestamp': time.time_ns(),
             'user': user_text,
             'response': response,
         })
-        self.conversation_history = self.conversation_history[-200:]
 
     def _update_last_history_response(self, response: str):
         if self.conversation_history:
@@ -227,15 +445,15 @@ class LightChatbot:
     # ---------------- Helpers: Rhasspy integration ----------------
     def _text_to_intent_rhasspy(self, text: str) -> Optional[Dict[str, Any]]:
         """Post text to Rhasspy and return the parsed intent JSON (or None)."""
-        url = f"{self.rhasspy_url}{RHASSPY_TEXT2INTENT_PATH}"
-        resp = requests.post(url, json={"text": text}, timeout=5)
+        resp = self._session.post(self._rhasspy_full_url, json={"text": text}, timeout=5)
         resp.raise_for_status()
-        data = resp.json()
-        # DEBUG: print Rhasspy response so we can inspect slots/format
-        try:
-            print("RHASSPY JSON ->", json.dumps(data, ensure_ascii=False))
-        except Exception:
-            print("RHASSPY JSON ->", data)
+        data = json_loads(resp.content)
+        # DEBUG: log Rhasspy response so we can inspect slots/format
+        if logger.isEnabledFor(logging.DEBUG):
+            try:
+                logger.debug("RHASSPY JSON -> %s", json_dumps(data))
+            except Exception:
+                logger.debug("RHASSPY JSON -> %s", data)
         if not data:
             return None
         return data
@@ -243,40 +461,20 @@ class LightChatbot:
     def _handle_intent_json(self, intent_json: Dict[str, Any]) -> str:
         """Normalize various intent JSON shapes and perform the action."""
         # DEBUG: quick dump for troubleshooting
-        try:
-            dbg_intent = intent_json.get('intent') or intent_json.get('intent_name') or intent_json.get('name')
-            dbg_text = intent_json.get('text') or intent_json.get('raw_text') or intent_json.get('rawText') or ''
-            print("DBG _handle_intent_json: intent:", dbg_intent, "text:", dbg_text)
-        except Exception:
-            pass
+        if logger.isEnabledFor(logging.DEBUG):
+            try:
+                dbg_intent = intent_json.get('intent') or intent_json.get('intent_name') or intent_json.get('name')
+                dbg_text = intent_json.get('text') or intent_json.get('raw_text') or intent_json.get('rawText') or ''
+                logger.debug("_handle_intent_json: intent: %s text: %s", dbg_intent, dbg_text)
+            except Exception:
+                pass
 
         # normalize intent name and slots
-        intent_name = None
-        slots = {}
+        intent_name, slots = self._intent_parser_for(intent_json)(intent_json)
 
-        if 'intent' in intent_json:
-            intent = intent_json.get('intent')
-            if isinstance(intent, dict):
-                intent_name = intent.get('name') or intent.get('intentName')
-            else:
-                intent_name = str(intent)
-            raw_slots = intent_json.get('slots') or []
-            slots = self._normalize_slots_list(raw_slots)
-
-        elif 'intent_name' in intent_json or 'intentName' in intent_json:
-            intent_name = intent_json.get('intent_name') or intent_json.get('intentName')
-            raw_slots = intent_json.get('slots') or []
-            slots = self._normalize_slots_list(raw_slots)
-
-        else:
-            intent_name = intent_json.get('intent') or intent_json.get('name') or intent_json.get('intentName')
-            raw_slots = intent_json.get('slots') or {}
-            if isinstance(raw_slots, dict):
-                slots = raw_slots
-            else:
-                slots = self._normalize_slots_list(raw_slots)
-
-        intent_name = (intent_name or '').lower()
+        # webhook payloads are arbitrary JSON; ignore names that aren't strings
+        intent_name = intent_name.lower() if isinstance(intent_name, str) else ''
+        is_query_intent, is_toggle_intent, is_status_intent = self._classify_intent_name(intent_name)
 
         # robust raw_text extraction
         raw_text = ''
@@ -289,55 +487,38 @@ class LightChatbot:
         raw_text = raw_text.lower().strip()
 
         # determine state from slots OR from raw_text
-        state_candidate = self._pick_slot_value(slots, ['state', 'switch', 'power', 'action'])
+        state_candidate = self._pick_slot_value(slots, STATE_SLOT_NAMES)
         if not state_candidate:
-            state_candidate = self._extract_state_from_text(raw_text)
+            state_candidate = self._extract_state_from_text(raw_text, already_lower=True)
 
         # room candidate from slots if present
-        room_candidate = self._pick_slot_value(slots, ['room', 'location', 'area', 'place'])
+        room_candidate = self._pick_slot_value(slots, ROOM_SLOT_NAMES)
         if room_candidate:
             room_candidate = str(room_candidate).strip().lower()
 
         # prefer 'all' if raw_text contains it as a whole word (avoid 'hall')
         if not room_candidate:
-            if re.search(r'\b(all|every|entire|everything|whole)\b', raw_text):
+            if ALL_RE.search(raw_text):
                 room_candidate = 'all'
 
         # fallback: find a known room inside raw_text (whole words)
         if not room_candidate:
-            for canonical, synonyms in self.room_mappings.items():
-                if re.search(r'\b' + re.escape(canonical) + r'\b', raw_text):
-                    room_candidate = canonical
-                    break
-                for syn in synonyms:
-                    if re.search(r'\b' + re.escape(syn) + r'\b', raw_text):
-                        room_candidate = canonical
-                        break
-                if room_candidate:
-                    break
-
-        canonical_room = self._map_room(room_candidate)
+            room_candidate = self._find_room_in_text(raw_text)
+
+        # room_candidate is already stripped and lowercased on every path above
+        canonical_room = self._map_room(room_candidate, already_lower=True)
 
         # detect "except <room>"
         except_room = None
         if 'except' in raw_text:
             try:
                 after = raw_text.split('except', 1)[1]
-                for canonical, syns in self.room_mappings.items():
-                    if re.search(r'\b' + re.escape(canonical) + r'\b', after):
-                        except_room = canonical
-                        break
-                    for s in syns:
-                        if re.search(r'\b' + re.escape(s) + r'\b', after):
-                            except_room = canonical
-                            break
-                    if except_room:
-                        break
+                except_room = self._find_room_in_text(after)
             except Exception:
                 except_room = None
 
         # HANDLE "all" (with optional except)
-        if (canonical_room == 'all') or (room_candidate and str(room_candidate).lower() in ['all', 'every', 'entire', 'everything', 'whole']):
+        if (canonical_room == 'all') or (room_candidate in ALL_SLOT_WORDS):
             if except_room:
                 if state_candidate in ['on', 'off']:
                     state_bool = state_candidate == 'on'
@@ -359,7 +540,7 @@ class LightChatbot:
                 return "Please tell me 'on' or 'off' when controlling all lights."
 
         # If intent is a status/query without any room, return overall status
-        if (not canonical_room) and any(k in intent_name for k in ['status', 'check', 'query', 'which', 'what', 'are', 'is']):
+        if (not canonical_room) and is_query_intent:
             return self._get_overall_status()
 
         if not canonical_room:
@@ -375,18 +556,53 @@ class LightChatbot:
             else:
                 return f"Couldn't set the {canonical_room} light."
 
-        if state_candidate == 'toggle' or 'toggle' in intent_name:
+        if state_candidate == 'toggle' or is_toggle_intent:
             new_state = self._toggle_room(canonical_room)
             if isinstance(new_state, bool):
                 return f"Toggled the {canonical_room} light {'on' if new_state else 'off'}."
             else:
                 return f"Couldn't toggle the {canonical_room} light."
 
-        if any(w in intent_name for w in ['status', 'check', 'is', 'are']):
+        if is_status_intent:
             return self._room_status_text(canonical_room)
 
         return "Sorry — I understood the intent but I'm not sure what action to take."
 
+    # ---------------- Helpers: intent JSON shapes ----------------
+    def _intent_parser_for(self, intent_json: Dict[str, Any]):
+        """Return the shape-specific parser for intent_json."""
+        if 'intent' in intent_json:
+            return self._parse_intent_v2
+        if 'intent_name' in intent_json or 'intentName' in intent_json:
+            return self._parse_intent_v2_alt
+        return self._parse_intent_flat
+
+    def _parse_intent_v2(self, intent_json: Dict[str, Any]) -> tuple:
+        """Rhasspy/Snips shape: {'intent': {'name': ...} or 'Name', 'slots': [...]}."""
+        intent = intent_json['intent']
+        if isinstance(intent, dict):
+            intent_name = intent.get('name') or intent.get('intentName')
+        else:
+            intent_name = str(intent)
+        return intent_name, self._normalize_slots_list(intent_json.get('slots') or [])
+
+    def _parse_intent_v2_alt(self, intent_json: Dict[str, Any]) -> tuple:
+        """Shape {'intent_name' or 'intentName': ..., 'slots': [...]}."""
+        intent_name = intent_json.get('intent_name') or intent_json.get('intentName')
+        return intent_name, self._normalize_slots_list(intent_json.get('slots') or [])
+
+    def _parse_intent_flat(self, intent_json: Dict[str, Any]) -> tuple:
+        """Shape {'name': ..., 'slots': {...} or [...]}."""
+        return intent_json.get('name'), self._normalize_slots_list(intent_json.get('slots') or {})
+
+    def _classify_intent_name(self, intent_name: str) -> tuple:
+        """Bucket an intent name into (is_query, is_toggle, is_status) flags."""
+        return (
+            any(k in intent_name for k in QUERY_INTENT_WORDS),
+            'toggle' in intent_name,
+            any(k in intent_name for k in STATUS_INTENT_WORDS),
+        )
+
     def _normalize_slots_list(self, raw_slots) -> Dict[str, Any]:
         """Convert various slot list shapes into a simple dict: {slot_name: value}."""
         slots = {}
@@ -408,25 +624,32 @@ class LightChatbot:
                     if name and val is not None:
                         slots[name] = str(val)
         except Exception:
-            traceback.print_exc()
+            logger.exception("Couldn't normalize intent slots")
         return slots
 
-    def _extract_state_from_text(self, raw_text: str) -> Optional[str]:
-        """Detect on/off/toggle from free text (tiny autocorrect for short typos)."""
+    def _extract_state_from_text(self, raw_text: str, tokens: Optional[List[str]] = None,
+                                 already_lower: bool = False) -> Optional[str]:
+        """Detect on/off/toggle from free text (tiny autocorrect for short typos).
+
+        Callers that already tokenized the lowercased text can pass the tokens.
+        """
         if not raw_text:
             return None
-        tokens = re.findall(r"[a-zA-Z]+", raw_text.lower())
-        candidates = ['on', 'off', 'toggle']
+        if tokens is None:
+            tokens = TOKEN_RE.findall(raw_text if already_lower else raw_text.lower())
+        # exact words win anywhere in the text; only leftover tokens are fuzzed
+        unknown = []
         for t in tokens:
-            if t in candidates:
+            if t in STATE_WORD_SET:
                 return t
-        for t in tokens:
-            m = difflib.get_close_matches(t, candidates, n=1, cutoff=0.6)
+            unknown.append(t)
+        for t in unknown:
+            m = _close_match(t, STATE_WORDS)
             if m:
-                return m[0]
+                return m
         return None
 
-    def _pick_slot_value(self, slots: Dict[str, Any], candidates: List[str]) -> Optional[str]:
+    def _pick_slot_value(self, slots: Dict[str, Any], candidates: Sequence[str]) -> Optional[str]:
         for c in candidates:
             if c in slots and slots[c]:
                 return str(slots[c])
@@ -436,43 +659,65 @@ class LightChatbot:
         return None
 
     # ---------------- Room mapping / fuzzy ----------------
-    def _map_room(self, raw_room: Optional[str]) -> Optional[str]:
-        """Return canonical room name if a close match is found, or 'all', or None."""
+    def _find_room_in_text(self, text: str) -> Optional[str]:
+        """Return the canonical room of the first whole-word room name/synonym in text."""
+        if self._room_automaton is not None:
+            best = None
+            n = len(text)
+            for end, (order, length, canonical) in self._room_automaton.iter(text):
+                start = end - length + 1
+                # cheap word-boundary check on the characters around the match
+                if start > 0 and _is_word_char(text[start - 1]):
+                    continue
+                if end + 1 < n and _is_word_char(text[end + 1]):
+                    continue
+                if best is None or (start, order) < best[:2]:
+                    best = (start, order, canonical)
+            return best[2] if best else None
+        m = self._room_re.search(text)
+        if m:
+            return self._room_groups[m.lastgroup]
+        return None
+
+    def _map_room(self, raw_room: Optional[str], already_lower: bool = False) -> Optional[str]:
+        """Return canonical room name if a close match is found, or 'all', or None.
+
+        Pass already_lower=True when raw_room is already stripped and lowercased.
+        """
         if not raw_room:
             return None
-        r = raw_room.strip().lower()
-        if r in ['all', 'every', 'entire', 'everything', 'house']:
+        return self._cached_lookup_room(raw_room if already_lower else raw_room.strip().lower())
+
+    def _lookup_room(self, r: str) -> Optional[str]:
+        """Uncached body of _map_room for an already normalized room string."""
+        if r in ALL_ROOM_WORDS:
             return 'all'
-        for canonical, synonyms in self.room_mappings.items():
-            if r == canonical or r in synonyms:
+        room = self._synonym_to_room.get(r)
+        if room:
+            return room
+        for syn, canonical in self._synonym_pairs:
+            if syn in r:
                 return canonical
-        for canonical, synonyms in self.room_mappings.items():
-            if any(syn in r for syn in synonyms):
-                return canonical
-        candidates = []
-        for canonical, synonyms in self.room_mappings.items():
-            candidates.append(canonical)
-            candidates.extend(synonyms)
-        match = difflib.get_close_matches(r, candidates, n=1, cutoff=0.6)
-        if match:
-            m = match[0]
-            for canonical, synonyms in self.room_mappings.items():
-                if m == canonical or m in synonyms:
-                    return canonical
+        m = _close_match(r, self._room_candidates)
+        if m:
+            return self._synonym_to_room[m]
         return None
 
     # ---------------- Controller actions ----------------
-    def _get_room_keys(self) -> List[str]:
+    def _get_room_keys(self) -> Sequence[str]:
         """Return the authoritative list of actual room keys to iterate."""
-        if hasattr(self.lights, 'leds') and isinstance(self.lights.leds, dict):
-            return list(self.lights.leds.keys())
-        if hasattr(self.lights, 'get_all_states'):
+        # captured when rooms were last refreshed from the controller
+        if self._cached_room_keys:
+            return self._cached_room_keys
+        if self._leds is not None:
+            return list(self._leds.keys())
+        if self._controller_get_all_states:
             try:
-                return list(self.lights.get_all_states().keys())
+                return list(self._controller_get_all_states().keys())
             except Exception:
                 pass
-        if hasattr(self.lights, 'states') and isinstance(self.lights.states, dict):
-            return list(self.lights.states.keys())
+        if self._states is not None:
+            return list(self._states.keys())
         # fallback to mapping keys
         return list(self.room_mappings.keys())
 
@@ -480,89 +725,69 @@ class LightChatbot:
         """Set one room; returns True on success."""
         try:
             # try preferred signature
-            if hasattr(self.lights, 'set_light'):
+            if self._set_light:
                 # Defensive: don't pass 'all' to controllers that don't expect it
                 if room == 'all':
                     # call the all-lights handler instead
                     return self._set_all_lights(state)
-                # ensure room is valid for controller if possible
-                if hasattr(self.lights, 'leds') and room not in self.lights.leds:
-                    # if controller doesn't know this room, fail gracefully
-                    # (but still try to map via get_all_states)
-                    if hasattr(self.lights, 'get_all_states'):
-                        if room not in self.lights.get_all_states().keys():
-                            return False
-                # call set_light
-                self.lights.set_light(room, state, source='chatbot')
+                # if controller doesn't know this room, fail gracefully
+                if self._controller_rooms and room not in self._controller_rooms:
+                    return False
+                self._set_light(room, state, source='chatbot')
                 return True
-            # fallback: toggle or set via simulator
-            if hasattr(self.lights, 'toggle_light') and hasattr(self.lights, 'get_light_state'):
-                current = self.lights.get_light_state(room)
+            # fallback: toggle via simulator-style controllers
+            if self._toggle_light and self._get_light_state:
+                current = self._get_light_state(room)
                 if current == state:
                     return True
-                # if controller has direct set_light, we would have used it; attempt toggle
-                if hasattr(self.lights, 'set_light'):
-                    self.lights.set_light(room, state, source='chatbot')
-                    return True
-                else:
-                    self.lights.toggle_light(room, source='chatbot')
-                    return True
+                self._toggle_light(room, source='chatbot')
+                return True
+            return False
         except KeyError:
             return False
         except Exception:
-            traceback.print_exc()
+            logger.exception("Failed to set the %s light", room)
             return False
 
     def _toggle_room(self, room: str):
         try:
-            if hasattr(self.lights, 'toggle_light'):
-                return self.lights.toggle_light(room, source='chatbot')
-            current = self.lights.get_light_state(room)
+            if self._toggle_light:
+                return self._toggle_light(room, source='chatbot')
+            current = self._get_light_state(room)
             ok = self._set_room_state(room, not current)
             if ok:
                 return not current
             return None
         except Exception:
-            traceback.print_exc()
+            logger.exception("Failed to toggle the %s light", room)
             return None
 
     def _set_all_lights(self, state: bool) -> bool:
         """Try to set all lights using controller's efficient method if available."""
         try:
             # If controller has explicit all-lights helpers, use them
-            if state:
-                if hasattr(self.lights, 'all_lights_on'):
-                    try:
-                        self.lights.all_lights_on(source='chatbot')
-                        return True
-                    except TypeError:
-                        # some implementations may not accept source kw
-                        try:
-                            self.lights.all_lights_on()
-                            return True
-                        except Exception:
-                            pass
-            else:
-                if hasattr(self.lights, 'all_lights_off'):
+            all_lights = self._all_lights_on if state else self._all_lights_off
+            if all_lights:
+                try:
+                    all_lights(source='chatbot')
+                    return True
+                except TypeError:
+                    # some implementations may not accept source kw
                     try:
-                        self.lights.all_lights_off(source='chatbot')
+                        all_lights()
                         return True
-                    except TypeError:
-                        try:
-                            self.lights.all_lights_off()
-                            return True
-                        except Exception:
-                            pass
+                    except Exception:
+                        pass
 
             # If no explicit helpers, iterate authoritative room keys
-            room_keys = self._get_room_keys()
+            # (one at a time: controllers aren't required to be thread-safe)
             success = True
-            for r in room_keys:
+            for r in self._get_room_keys():
                 ok = self._set_room_state(r, state)
                 success = success and bool(ok)
             return success
         except Exception:
-            traceback.print_exc()
+            logger.exception("Failed to set all lights")
             return False
 
     # ---------------- Status helpers ----------------
@@ -575,16 +800,13 @@ class LightChatbot:
 
     def _get_overall_status(self) -> str:
         try:
-            if hasattr(self.lights, 'get_all_states'):
-                states = self.lights.get_all_states()
-            else:
-                states = {r: self.lights.get_light_state(r) for r in self.room_mappings.keys()}
+            states = self._get_all_states()
             on_rooms = [r for r, s in states.items() if s]
             if not on_rooms:
                 return "No lights are currently on."
             return f"Lights currently on: {', '.join(on_rooms)}."
         except Exception:
-            traceback.print_exc()
+            logger.exception("Couldn't read light states")
             return "Couldn't determine overall status."
 
     def _format_all_response(self, success: bool, state_bool: bool) -> str:
@@ -593,36 +815,30 @@ class LightChatbot:
         return "Failed to control all lights."
 
     # ---------------- Local fallback parser ----------------
-    def _local_fallback_parse(self, text: str) -> str:
-        t = text.lower()
-        if any(w in t for w in ['turn on', 'switch on', 'enable', 'on']):
-            verb = 'on'
-        elif any(w in t for w in ['turn off', 'switch off', 'disable', 'off']):
-            verb = 'off'
-        elif 'toggle' in t:
-            verb = 'toggle'
-        elif any(w in t for w in ['status', 'is', 'are', 'state']):
-            verb = 'status'
-        else:
-            verb = None
+    def _local_fallback_parse(self, text: str, already_lower: bool = False) -> str:
+        t = text if already_lower else text.lower()
+        tokens = set(TOKEN_RE.findall(t))
 
+        # one pass over the words; on > off > toggle > status when several appear
+        found = {VERB_WORDS[w] for w in tokens if w in VERB_WORDS}
+        verb = next((v for v in VERB_PRIORITY if v in found), None)
         room_candidate = None
-        for canonical, synonyms in self.room_mappings.items():
-            if canonical in t or any(syn in t for syn in synonyms):
+        for canonical, words, phrases in self._room_vocab:
+            if (tokens & words) or any(p in t for p in phrases):
                 room_candidate = canonical
                 break
 
-        if not room_candidate and 'all' in t:
+        if not room_candidate and 'all' in tokens:
             room_candidate = 'all'
 
         if not verb:
-            return "I couldn't understand the command. Examples: 'turn on kitchen light'"
+            return UNKNOWN_COMMAND_REPLY
 
         if room_candidate == 'all':
             if verb in ['on', 'off']:
                 ok = self._set_all_lights(verb == 'on')
                 return self._format_all_response(ok, verb == 'on')
-            return "Try 'turn on all lights' or 'turn off all lights'."
+            return ALL_LIGHTS_HINT_REPLY
 
         if not room_candidate:
             available = ', '.join(sorted(self.room_mappings.keys()))
@@ -648,11 +864,12 @@ class LightChatbot:
 
 # When run directly, act as a simple CLI using the controller if present
 if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s %(levelname)s %(message)s')
     print('Starting LightChatbot CLI...')
     lights = None
     try:
-        if HARDWARE_AVAILABLE:
-            lights = RoomLightsController()
+        from hardware.room_lights import RoomLightsController
+        lights = RoomLightsController()
     except Exception:
         pass
 
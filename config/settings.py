@@ -28,8 +28,7 @@ BEDROOM_SENSORS = {
     'us2_trigger': 25,
     'us2_echo': 12,
     
-    'ldr_channel': 0,  # ADS1115 channel for LDR (A0)
-    'ads1115_address': 0x48  # Default I2C address for ADS1115
+    'ldr_gpio': 4  # RC-timed LDR node (BCM 4, physical pin 7)
 }
 
 # Automation settings - OPTIMIZED FOR 42CM DOORWAY
@@ -47,10 +46,18 @@ US2_NORMAL_DISTANCE = 42       # cm - side sensor across doorway
 
 EXIT_DELAY = 10                # seconds delay before turning off light
 
+# Optional real-time tuning of the bedroom automation thread (Linux).
+# Only useful with ASYNC_MODE = 'threading': under eventlet/gevent the
+# automation "thread" is a greenlet and this would apply to the whole server.
+BEDROOM_CPU = None             # e.g. 3 to pin to core 3 (boot with isolcpus=3)
+BEDROOM_RT_PRIORITY = None     # e.g. 20 for SCHED_FIFO; needs CAP_SYS_NICE
+
 # Web server settings
 HOST = '0.0.0.0'
 PORT = 5000
 DEBUG = False
 SECRET_KEY = 'your_secret_key_here'
+# Socket.IO async mode: 'eventlet', 'gevent' or 'threading'
+ASYNC_MODE = 'eventlet'
 # Rhasspy URL used by chatbot
 RHASSPY_URL = "http://localhost:12101"
\ No newline at end of file
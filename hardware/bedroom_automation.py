@@ -10,8 +10,13 @@ LDR implemented via RC timing on a GPIO pin:
 """
 
 import time
-from threading import Thread, Lock
+import statistics
+from threading import Thread, Lock, Event
 from enum import Enum
+from collections import deque
+from queue import Queue
+import logging
+from logging.handlers import QueueHandler, QueueListener
 import sys
 import os
 
@@ -37,12 +42,88 @@ except Exception:
     US2_NORMAL_DISTANCE = 17.0
     EXIT_DELAY = 8
 
+# Optional real-time tuning for the automation thread (Linux only, off by default).
+# BEDROOM_CPU pins it to one core (pair with the isolcpus= kernel arg);
+# BEDROOM_RT_PRIORITY runs it under SCHED_FIFO and needs CAP_SYS_NICE.
+try:
+    from config.settings import BEDROOM_CPU, BEDROOM_RT_PRIORITY
+except Exception:
+    BEDROOM_CPU = None
+    BEDROOM_RT_PRIORITY = None
+
+logger = logging.getLogger(__name__)
+if logger.level == logging.NOTSET:
+    logger.setLevel(logging.INFO)
+logger.propagate = False  # printed by _LOG_LISTENER; root handlers would print it twice
+
+# status lines go through one QueueHandler on the module logger; a QueueListener
+# (running while any automation runs) prints them so the loop never blocks on
+# stdout (queue.Queue rather than SimpleQueue so it stays green under eventlet)
+_console = logging.StreamHandler(sys.stdout)
+_console.setFormatter(logging.Formatter('%(message)s'))
+_LOG_HANDLER = QueueHandler(Queue())
+_LOG_LISTENER = QueueListener(_LOG_HANDLER.queue, _console)
+_LOG_USERS = 0
+_LOG_USERS_LOCK = Lock()
+
+def _acquire_logging():
+    """Attach the shared handler and start its listener for the first running automation"""
+    global _LOG_USERS
+    with _LOG_USERS_LOCK:
+        _LOG_USERS += 1
+        if _LOG_USERS == 1:
+            _LOG_LISTENER.start()
+            logger.addHandler(_LOG_HANDLER)
+
+def _release_logging():
+    """Drop one automation's use; flush and stop the listener after the last one"""
+    global _LOG_USERS
+    with _LOG_USERS_LOCK:
+        _LOG_USERS -= 1
+        if _LOG_USERS == 0:
+            logger.removeHandler(_LOG_HANDLER)
+            _LOG_LISTENER.stop()
+
 # LDR timing defaults (seconds)
 DEFAULT_LDR_THRESHOLD_SECONDS = 0.12   # initial guess; calibrate with the helper below
 LDR_SAMPLE_COUNT = 7
 LDR_SAMPLE_DELAY = 0.05   # seconds between samples
 RC_DISCHARGE_MS = 10      # milliseconds to hold pin LOW to discharge capacitor
 RC_TIMEOUT = 2.0          # maximum wait for cap to charge
+LDR_CACHE_TTL = 1.0       # seconds a median LDR reading is reused before re-measuring
+LDR_EWMA_ALPHA = 0.1      # weight of each new background sample (pigpio only)
+
+# Number of recent sonar readings kept for the debug averages
+READINGS_WINDOW = 100
+
+# Periodic status line, formatted from plain values and printed by a worker thread
+STATUS_FORMAT = (
+    "📊 US1: {us1:5.1f}cm (avg:{us1_avg:5.1f}) | US2: {us2:5.1f}cm (avg:{us2_avg:5.1f}) "
+    "| LDR_time: {ldr} | State: {state}\n"
+    "   US1: {us1_status} | US2: {us2_status}"
+)
+
+# Automation loop period (seconds): fast around sensor activity, slower when idle
+ACTIVE_LOOP_INTERVAL = 0.1
+IDLE_LOOP_INTERVAL = 0.2
+
+# Entry/exit sequence detection (seconds)
+SEQUENCE_MAX_GAP = 1.0    # max time between the two sensors' triggers
+SEQUENCE_WINDOW = 1.5     # how long a completed sequence stays eligible
+
+# Ultrasonic timing (pigpio backend)
+TRIGGER_PULSE_US = 10     # HC-SR04 needs a >= 10us trigger pulse
+ECHO_TIMEOUT = 0.04       # seconds; a no-obstacle echo is ~38ms long
+CM_PER_ECHO_US = 0.01715   # cm of distance per microsecond of echo (343 m/s, there and back)
+CM_PER_ECHO_NS = CM_PER_ECHO_US / 1000   # same, for monotonic_ns() timings
+POLL_TIMEOUT_NS = 100_000_000  # RPi.GPIO fallback: give up on an echo edge after 100ms
+
+# Sonar retries: HC-SR04 often misses soft targets (people), so a timeout is
+# pinged again once the previous burst has died out. At most one sensor is
+# retried per tick, and only if its previous read was valid (a sensor that keeps
+# missing has nothing to find), so a retry adds at most one ECHO_TIMEOUT plus the
+# rest of SONAR_PING_INTERVAL (~60ms; ~200ms on the RPi.GPIO fallback) to one tick
+SONAR_PING_INTERVAL = 0.06  # seconds between ping starts; late echoes read as new ones otherwise
 
 # Try to import RPi.GPIO; enable simulation mode if unavailable
 try:
@@ -52,26 +133,95 @@ except ImportError:
     print("RPi.GPIO not available - running in SIMULATION MODE")
     GPIO_AVAILABLE = False
 
+# Optional: pigpio daemon (already used by the room lights) for hardware-timed
+# trigger pulses and echo edges timestamped in C instead of Python polling
+try:
+    import pigpio
+    PIGPIO_AVAILABLE = True
+except ImportError:
+    PIGPIO_AVAILABLE = False
+
 class RoomState(Enum):
     EMPTY = 0
     OCCUPIED = 1
     EXITING = 2
 
 class BedroomAutomation:
+    # fixed attribute set: no per-instance __dict__, slot access in the hot loop
+    __slots__ = (
+        'lights', 'simulation_mode', 'state', 'lock', 'running', 'thread', '_stop_event',
+        '_us1_trig', '_us1_echo', '_us2_trig', '_us2_echo', '_ldr_gpio', '_sim_distance',
+        '_ping', '_read_both', '_sonar_retry', '_sonar_missed',
+        '_prev_us1', '_prev_us2', '_last_us1_rise', '_last_us2_rise',
+        '_us1_rise_distance', '_us2_rise_distance', '_exit_deadline', '_now',
+        'pi', '_echo_callbacks', '_echo_rise', '_echo_fall', '_echo_done',
+        '_ldr_rise_tick', '_ldr_done', '_ldr_sample_start', '_ldr_sample_deadline', '_ldr_drain_until', '_ldr_ewma',
+        '_ldr_cache_value', '_ldr_cache_time', 'ldr_threshold',
+        'us1_readings', 'us2_readings', '_next_debug_print',
+    )
+
     def __init__(self, lights_controller=None):
         self.lights = lights_controller
+
+        # sensor pins, looked up once instead of on every read
+        self._us1_trig = BEDROOM_SENSORS['us1_trigger']
+        self._us1_echo = BEDROOM_SENSORS['us1_echo']
+        self._us2_trig = BEDROOM_SENSORS['us2_trigger']
+        self._us2_echo = BEDROOM_SENSORS['us2_echo']
+        self._ldr_gpio = BEDROOM_SENSORS.get('ldr_gpio', 4)
+        # simulated distance source per trigger pin
+        self._sim_distance = {
+            self._us1_trig: self._simulate_us1,
+            self._us2_trig: self._simulate_us2,
+        }
+
         self.simulation_mode = not GPIO_AVAILABLE
+        # sonar readers picked once for the backend in use (setup_sensors
+        # switches them to pigpio), so the 10 Hz loop carries no mode checks
+        self._ping = self._read_ultrasonic_gpio
+        self._read_both = self._read_both_simulated if self.simulation_mode else self._read_both_separately
+        self._sonar_retry = True     # this tick's single sonar retry is still unused
+        self._sonar_missed = set()   # trigger pins whose latest read timed out
         self.state = RoomState.EMPTY
-        self.last_sensor_events = []
-        self.exit_timer = None
+        # time and distance of each sensor's latest False -> True transition;
+        # entry is US2 then US1 rising within SEQUENCE_MAX_GAP, exit the mirror
+        self._prev_us1 = self._prev_us2 = False
+        self._last_us1_rise = self._last_us2_rise = 0.0
+        self._us1_rise_distance = self._us2_rise_distance = None
+        self._exit_deadline = None  # monotonic time the exit delay ends, while EXITING
         self.lock = Lock()
         self.running = False
         self.thread = None
+        self._stop_event = Event()  # set by stop() to cut the loop's sleep short
+        self._now = 0.0
+
+        # pigpio echo capture: rising/falling ticks per echo pin, and an Event
+        # set by the falling-edge callback
+        self.pi = None
+        self._echo_callbacks = []
+        self._echo_rise = {}
+        self._echo_fall = {}
+        self._echo_done = {}
+        # pigpio LDR capture: tick of the node's rising edge, set by its callback
+        self._ldr_rise_tick = None
+        self._ldr_done = Event()
+        # background LDR sampling (pigpio): start tick and monotonic deadline of
+        # the charge in flight, when the node held LOW will have drained (None
+        # when it is not draining), and the smoothed charge time it feeds
+        self._ldr_sample_start = None
+        self._ldr_sample_deadline = 0.0
+        self._ldr_drain_until = None
+        self._ldr_ewma = None
+
+        # last median LDR reading and when it was taken (see read_ldr_time)
+        self._ldr_cache_value = None
+        self._ldr_cache_time = float('-inf')
 
         # stats
-        self.us1_readings = []
-        self.us2_readings = []
-        self.last_debug_output = 0.0
+        # last READINGS_WINDOW distances per sensor; oldest dropped in O(1)
+        self.us1_readings = deque(maxlen=READINGS_WINDOW)
+        self.us2_readings = deque(maxlen=READINGS_WINDOW)
+        self._next_debug_print = 0.0   # monotonic time the next status line is due
 
         # LDR threshold seconds: use config LIGHT_THRESHOLD if it looks like a seconds value (0.001..10)
         try:
@@ -96,66 +246,156 @@ class BedroomAutomation:
 
     def setup_sensors(self):
         """Initialize GPIO pins for ultrasonic and prepare LDR node usage (no steady input setup)."""
+        # Prefer pigpio for every sensor pin when pigpiod is running
+        if PIGPIO_AVAILABLE:
+            pi = pigpio.pi()
+            if pi.connected:
+                self._setup_pigpio(pi)
+                return
+            print("⚠️ pigpiod not reachable - timing ultrasonic echoes with RPi.GPIO polling")
+
         GPIO.setmode(GPIO.BCM)
         # Ultrasonic sensor pins
-        GPIO.setup(BEDROOM_SENSORS['us1_trigger'], GPIO.OUT)
-        GPIO.setup(BEDROOM_SENSORS['us1_echo'], GPIO.IN)
-        GPIO.setup(BEDROOM_SENSORS['us2_trigger'], GPIO.OUT)
-        GPIO.setup(BEDROOM_SENSORS['us2_echo'], GPIO.IN)
-        GPIO.output(BEDROOM_SENSORS['us1_trigger'], False)
-        GPIO.output(BEDROOM_SENSORS['us2_trigger'], False)
+        GPIO.setup(self._us1_trig, GPIO.OUT)
+        GPIO.setup(self._us1_echo, GPIO.IN)
+        GPIO.setup(self._us2_trig, GPIO.OUT)
+        GPIO.setup(self._us2_echo, GPIO.IN)
+        GPIO.output(self._us1_trig, False)
+        GPIO.output(self._us2_trig, False)
         time.sleep(0.2)
 
         # Note: LDR node pin will be switched between OUT (to discharge) and IN (to measure)
-        print("✅ GPIO (ultrasonics) initialized - LDR uses RC timing on pin", BEDROOM_SENSORS.get('ldr_gpio'))
+        print("✅ GPIO (ultrasonics) initialized - LDR uses RC timing on pin", self._ldr_gpio)
+
+    def _setup_pigpio(self, pi):
+        """Drive all sensor pins through pigpiod: daemon-timed trigger pulses and edge callbacks."""
+        self.pi = pi
+        self._ping = self._read_ultrasonic_pigpio
+        for trig in (self._us1_trig, self._us2_trig):
+            pi.set_mode(trig, pigpio.OUTPUT)
+            pi.write(trig, 0)
+        for echo in (self._us1_echo, self._us2_echo):
+            pi.set_mode(echo, pigpio.INPUT)
+            self._echo_done[echo] = Event()
+            self._echo_callbacks.append(pi.callback(echo, pigpio.EITHER_EDGE, self._on_echo_edge))
+        self._echo_callbacks.append(pi.callback(self._ldr_gpio, pigpio.RISING_EDGE, self._on_ldr_rise))
+        time.sleep(0.2)
+        print("✅ pigpio sensors initialized - echoes and LDR (pin", self._ldr_gpio, ") timed by callbacks")
 
-    # --- Ultrasonic reading (unchanged) ---
+    # --- Ultrasonic reading ---
     def read_ultrasonic_distance(self, trigger_pin, echo_pin):
-        """Return distance (cm) or 500 as timeout sentinel or None on error."""
+        """Return the distance in cm, or 500 on a timeout; a miss may be retried once per tick."""
         if self.simulation_mode:
-            # simulate around the normal 42cm, occasionally produce a close reading
-            now = time.time()
-            if trigger_pin == BEDROOM_SENSORS['us1_trigger']:
-                base = US1_NORMAL_DISTANCE
-                if int(now) % 15 in (2,3,4):
-                    return 30.0  # simulated person
-                return base + (now % 3)
-            else:
-                base = US2_NORMAL_DISTANCE
-                if int(now) % 12 in (5,6):
-                    return 32.0
-                return base + (now % 2)
+            return self._sim_distance[trigger_pin]()
+        started = time.monotonic()
+        d = self._ping(trigger_pin, echo_pin)
+        missed = self._sonar_missed
+        if d >= 500 and self._sonar_retry and trigger_pin not in missed:
+            self._sonar_retry = False
+            time.sleep(max(0.0, started + SONAR_PING_INTERVAL - time.monotonic()))
+            d = self._ping(trigger_pin, echo_pin)
+        if d >= 500:
+            missed.add(trigger_pin)
+        else:
+            missed.discard(trigger_pin)
+        return d
+
+    # simulate around the normal distance, occasionally produce a close reading
+    @staticmethod
+    def _simulate_us1():
+        now = time.time()
+        if int(now) % 15 in (2,3,4):
+            return 30.0  # simulated person
+        return US1_NORMAL_DISTANCE + (now % 3)
+
+    @staticmethod
+    def _simulate_us2():
+        now = time.time()
+        if int(now) % 12 in (5,6):
+            return 32.0
+        return US2_NORMAL_DISTANCE + (now % 2)
+
+    def _read_ultrasonic_gpio(self, trigger_pin, echo_pin):
+        """Single RPi.GPIO ping by polling the echo pin; distance in cm or 500 on timeout."""
         try:
             GPIO.output(trigger_pin, True)
             time.sleep(0.00001)
             GPIO.output(trigger_pin, False)
 
-            start_time = time.time()
-            stop_time = time.time()
+            # one integer-ns monotonic clock read per poll, reused for the timeout
+            # check; both callables bound locally for the spin loops
+            gpio_input = GPIO.input
+            monotonic_ns = time.monotonic_ns
+            start_ns = stop_ns = monotonic_ns()
 
-            timeout = time.time() + 0.1
-            while GPIO.input(echo_pin) == 0:
-                start_time = time.time()
-                if time.time() > timeout:
+            timeout = start_ns + POLL_TIMEOUT_NS
+            while gpio_input(echo_pin) == 0:
+                start_ns = monotonic_ns()
+                if start_ns > timeout:
                     return 500
-            timeout = time.time() + 0.1
-            while GPIO.input(echo_pin) == 1:
-                stop_time = time.time()
-                if time.time() > timeout:
+            timeout = start_ns + POLL_TIMEOUT_NS
+            while gpio_input(echo_pin) == 1:
+                stop_ns = monotonic_ns()
+                if stop_ns > timeout:
                     return 500
-            elapsed = stop_time - start_time
-            distance = (elapsed * 34300) / 2.0
-            return distance
+            return (stop_ns - start_ns) * CM_PER_ECHO_NS
+        except Exception as e:
+            print("Ultrasonic read error:", e)
+            return 500
+
+    def _on_echo_edge(self, gpio, level, tick):
+        """pigpio callback: record echo edge ticks (microseconds, from the daemon)."""
+        if level == 1:
+            self._echo_rise[gpio] = tick
+        elif level == 0:
+            self._echo_fall[gpio] = tick
+            self._echo_done[gpio].set()
+
+    def _arm_echo(self, echo_pin):
+        """Forget the previous ping's edges before triggering a new one."""
+        self._echo_done[echo_pin].clear()
+        self._echo_rise.pop(echo_pin, None)
+
+    def _echo_distance(self, echo_pin, timeout):
+        """Wait for the armed echo's falling edge; distance in cm or 500 on timeout."""
+        if not self._echo_done[echo_pin].wait(timeout):
+            return 500
+        rise = self._echo_rise.get(echo_pin)
+        if rise is None:
+            return 500
+        return pigpio.tickDiff(rise, self._echo_fall[echo_pin]) * CM_PER_ECHO_US
+
+    def _read_ultrasonic_pigpio(self, trigger_pin, echo_pin):
+        """Hardware-timed trigger pulse, then wait for the echo's falling edge."""
+        try:
+            self._arm_echo(echo_pin)
+            self.pi.gpio_trigger(trigger_pin, TRIGGER_PULSE_US, 1)
+            return self._echo_distance(echo_pin, ECHO_TIMEOUT)
         except Exception as e:
             print("Ultrasonic read error:", e)
             return 500
 
+    def read_both_sensors(self):
+        """Return ((us2_detected, us2_distance), (us1_detected, us1_distance))."""
+        return self._read_both()
+
+    def _read_both_simulated(self):
+        d1 = self._simulate_us1()
+        d2 = self._simulate_us2()
+        return (d2 < US2_DISTANCE_THRESHOLD, d2), (d1 < US1_DISTANCE_THRESHOLD, d1)
+
+    def _read_both_separately(self):
+        # one sonar at a time: both face the doorway, so pinging them together
+        # lets each hear the other's burst as a false near echo
+        self._sonar_retry = True
+        return self.read_us2_sensor(), self.read_us1_sensor()
+
     def read_us1_sensor(self):
-        d = self.read_ultrasonic_distance(BEDROOM_SENSORS['us1_trigger'], BEDROOM_SENSORS['us1_echo'])
+        d = self.read_ultrasonic_distance(self._us1_trig, self._us1_echo)
         return (d is not None) and (d < US1_DISTANCE_THRESHOLD), d
 
     def read_us2_sensor(self):
-        d = self.read_ultrasonic_distance(BEDROOM_SENSORS['us2_trigger'], BEDROOM_SENSORS['us2_echo'])
+        d = self.read_ultrasonic_distance(self._us2_trig, self._us2_echo)
         return (d is not None) and (d < US2_DISTANCE_THRESHOLD), d
 
     # --- RC LDR timing functions ---
@@ -163,9 +403,13 @@ class BedroomAutomation:
         """Drive LDR node low to discharge the capacitor."""
         if self.simulation_mode:
             return
-        gpio = BEDROOM_SENSORS.get('ldr_gpio', 4)
-        GPIO.setup(gpio, GPIO.OUT)
-        GPIO.output(gpio, GPIO.LOW)
+        gpio = self._ldr_gpio
+        if self.pi is not None:
+            self.pi.set_mode(gpio, pigpio.OUTPUT)
+            self.pi.write(gpio, 0)
+            time.sleep(RC_DISCHARGE_MS / 1000.0)
+            return
+        GPIO.setup(gpio, GPIO.OUT, initial=GPIO.LOW)
         time.sleep(RC_DISCHARGE_MS / 1000.0)
 
     def measure_ldr_charge_time(self, timeout=RC_TIMEOUT):
@@ -177,21 +421,85 @@ class BedroomAutomation:
             now = time.time()
             # simulate short times for bright, long times for dark
             return 0.04 if (int(now) % 10) < 5 else 0.6
+        if self.pi is not None:
+            return self._measure_ldr_pigpio(timeout)
 
         try:
-            gpio = BEDROOM_SENSORS.get('ldr_gpio', 4)
+            gpio = self._ldr_gpio
             self._discharge_cap()
             GPIO.setup(gpio, GPIO.IN)
-            start = time.monotonic()
+            gpio_input, high, monotonic = GPIO.input, GPIO.HIGH, time.monotonic
+            start = monotonic()
             deadline = start + timeout
-            while time.monotonic() < deadline:
-                if GPIO.input(gpio) == GPIO.HIGH:
-                    return time.monotonic() - start
+            while monotonic() < deadline:
+                if gpio_input(gpio) == high:
+                    return monotonic() - start
             return None
         except Exception as e:
             print("LDR measure error:", e)
             return None
 
+    def _on_ldr_rise(self, gpio, level, tick):
+        """pigpio callback: the RC node has charged past the HIGH threshold."""
+        self._ldr_rise_tick = tick
+        self._ldr_done.set()
+        start = self._ldr_sample_start
+        if start is not None:
+            self._ldr_sample_start = None
+            self._update_ldr_ewma(pigpio.tickDiff(start, tick) / 1e6)
+
+    def _update_ldr_ewma(self, sample):
+        ewma = self._ldr_ewma
+        self._ldr_ewma = sample if ewma is None else ewma + LDR_EWMA_ALPHA * (sample - ewma)
+
+    def _sample_ldr(self, now):
+        """Drain the RC node on one tick and release it on a later one; its rising-edge
+        callback feeds the charge time into the EWMA.
+
+        The node drains through the loop's idle sleep, so no tick waits out
+        RC_DISCHARGE_MS. A charge still running past RC_TIMEOUT counts as a
+        maximally dark sample.
+        """
+        if self._ldr_sample_start is not None:
+            if now < self._ldr_sample_deadline:
+                return
+            self._ldr_sample_start = None
+            self._update_ldr_ewma(RC_TIMEOUT)
+        pi, gpio = self.pi, self._ldr_gpio
+        try:
+            if self._ldr_drain_until is None:
+                # previous charge is over: start draining, release on a later tick
+                pi.set_mode(gpio, pigpio.OUTPUT)
+                pi.write(gpio, 0)
+                self._ldr_drain_until = now + RC_DISCHARGE_MS / 1000.0
+                return
+            if now < self._ldr_drain_until:
+                return
+            self._ldr_drain_until = None
+            self._ldr_sample_deadline = now + RC_TIMEOUT
+            self._ldr_sample_start = pi.get_current_tick()
+            pi.set_mode(gpio, pigpio.INPUT)
+        except Exception as e:
+            self._ldr_sample_start = self._ldr_drain_until = None
+            print("LDR measure error:", e)
+
+    def _measure_ldr_pigpio(self, timeout):
+        """Discharge, release the node and sleep until its rising-edge callback fires."""
+        try:
+            gpio = self._ldr_gpio
+            self._ldr_sample_start = None  # this edge is ours, not a background sample's
+            self._ldr_drain_until = None   # and the node ends charged: background must drain it again
+            self._discharge_cap()
+            self._ldr_done.clear()
+            start = self.pi.get_current_tick()
+            self.pi.set_mode(gpio, pigpio.INPUT)
+            if not self._ldr_done.wait(timeout):
+                return None
+            return pigpio.tickDiff(start, self._ldr_rise_tick) / 1e6
+        except Exception as e:
+            print("LDR measure error:", e)
+            return None
+
     def measure_ldr_median(self, samples=LDR_SAMPLE_COUNT, delay=LDR_SAMPLE_DELAY):
         vals = []
         for _ in range(samples):
@@ -201,7 +509,17 @@ class BedroomAutomation:
             time.sleep(delay)
         if not vals:
             return None
-        return statistics.median(vals)
+        return statistics.median_low(vals)
+
+    def read_ldr_time(self):
+        """Smoothed background LDR charge time when pigpio is sampling it, otherwise
+        a median measurement reused while younger than LDR_CACHE_TTL."""
+        if self._ldr_ewma is not None:
+            return self._ldr_ewma
+        if time.monotonic() - self._ldr_cache_time > LDR_CACHE_TTL:
+            self._ldr_cache_value = self.measure_ldr_median()
+            self._ldr_cache_time = time.monotonic()
+        return self._ldr_cache_value
 
     def is_room_dark(self, threshold_seconds=None):
         """
@@ -210,7 +528,7 @@ class BedroomAutomation:
         """
         if threshold_seconds is None:
             threshold_seconds = self.ldr_threshold
-        med = self.measure_ldr_median()
+        med = self.read_ldr_time()
         if med is None:
             # treat measurement failure as dark (safe default), but could be changed
             return True, None
@@ -221,61 +539,108 @@ class BedroomAutomation:
         if self.running:
             return
         self.running = True
+        self._stop_event.clear()
+        _acquire_logging()
         self.thread = Thread(target=self._automation_loop, daemon=True)
         self.thread.start()
         print("✅ Bedroom automation started")
 
     def stop(self):
+        was_running = self.running
         self.running = False
+        self._stop_event.set()
         if self.thread:
             self.thread.join(timeout=2.0)
+        if was_running:
+            # flush pending status lines; the last automation stops the listener
+            _release_logging()
         print("🛑 Bedroom automation stopped")
 
+    def cleanup(self):
+        """Release the pigpio connection and echo callbacks (call after stop())."""
+        for cb in self._echo_callbacks:
+            cb.cancel()
+        self._echo_callbacks = []
+        if self.pi is not None:
+            self.pi.stop()
+            self.pi = None
+            self._ping = self._read_ultrasonic_gpio
+
+    def _apply_realtime_scheduling(self):
+        """Pin the calling thread to BEDROOM_CPU and/or make it SCHED_FIFO, if configured."""
+        if BEDROOM_CPU is not None:
+            try:
+                os.sched_setaffinity(0, {BEDROOM_CPU})
+                print(f"📌 Bedroom automation pinned to CPU {BEDROOM_CPU}")
+            except (AttributeError, OSError) as e:
+                print("⚠️ Could not set CPU affinity:", e)
+        if BEDROOM_RT_PRIORITY is not None:
+            try:
+                os.sched_setscheduler(0, os.SCHED_FIFO, os.sched_param(BEDROOM_RT_PRIORITY))
+                print(f"⏱️ Bedroom automation running SCHED_FIFO priority {BEDROOM_RT_PRIORITY}")
+            except (AttributeError, OSError) as e:
+                print("⚠️ Could not set SCHED_FIFO (needs CAP_SYS_NICE):", e)
+
     def _automation_loop(self):
+        self._apply_realtime_scheduling()
         while self.running:
             try:
                 self._check_occupancy()
-                time.sleep(0.1)
+                self._stop_event.wait(self._loop_interval())
             except Exception as e:
                 print("Error in automation loop:", e)
-                time.sleep(1)
+                self._stop_event.wait(1)
 
-    def _check_occupancy(self):
-        us2_detected, us2_distance = self.read_us2_sensor()
-        us1_detected, us1_distance = self.read_us1_sensor()
-
-        current_time = time.time()
-        event = {
-            'time': current_time,
-            'us2': us2_detected,
-            'us1': us1_detected,
-            'us2_distance': us2_distance,
-            'us1_distance': us1_distance
-        }
+    def _loop_interval(self):
+        """Poll fast while someone is near a sensor, slower once the doorway is quiet."""
+        if self._prev_us1 or self._prev_us2:
+            return ACTIVE_LOOP_INTERVAL
+        if self._now - max(self._last_us1_rise, self._last_us2_rise) < SEQUENCE_WINDOW:
+            return ACTIVE_LOOP_INTERVAL
+        return IDLE_LOOP_INTERVAL
 
-        self.last_sensor_events.append(event)
-        self.last_sensor_events = [e for e in self.last_sensor_events if current_time - e['time'] < 1.5]
+    def _check_occupancy(self):
+        (us2_detected, us2_distance), (us1_detected, us1_distance) = self._read_both()
+
+        # one monotonic timestamp per tick (immune to NTP steps)
+        current_time = time.monotonic()
+        if us2_detected and not self._prev_us2:
+            self._last_us2_rise = current_time
+            self._us2_rise_distance = us2_distance
+        if us1_detected and not self._prev_us1:
+            self._last_us1_rise = current_time
+            self._us1_rise_distance = us1_distance
+        self._prev_us2 = us2_detected
+        self._prev_us1 = us1_detected
+        self._now = current_time
+        if self.pi is not None:
+            self._sample_ldr(current_time)
 
         # statistics
         self.us1_readings.append(us1_distance)
         self.us2_readings.append(us2_distance)
-        if len(self.us1_readings) > 100:
-            self.us1_readings.pop(0)
-            self.us2_readings.pop(0)
 
-        # debug output every ~3 seconds
-        now = time.time()
-        if now - self.last_debug_output > 3.0:
-            is_dark, ldr_time = self.is_room_dark(self.ldr_threshold) if self.simulation_mode == False else self.is_room_dark(self.ldr_threshold)
-            us1_avg = sum([x for x in self.us1_readings if x is not None]) / len(self.us1_readings) if self.us1_readings else 0
-            us2_avg = sum([x for x in self.us2_readings if x is not None]) / len(self.us2_readings) if self.us2_readings else 0
-            ldr_disp = f"{(ldr_time if ldr_time is not None else 'ERR'):>6}"
-            ldr_state = "DARK" if is_dark else "BRIGHT"
-            print(f"📊 US1: {us1_distance:5.1f}cm (avg:{us1_avg:5.1f}) | US2: {us2_distance:5.1f}cm (avg:{us2_avg:5.1f}) | LDR_time: {ldr_disp}s ({ldr_state}) | State: {self.state.name}")
-            us1_status = "🔴 TRIGGERED" if us1_detected else "🟢 NORMAL"
-            us2_status = "🔴 TRIGGERED" if us2_detected else "🟢 NORMAL"
-            print(f"   US1: {us1_status} | US2: {us2_status}")
-            self.last_debug_output = now
+        # debug output every ~3 seconds; shows the last LDR reading rather than
+        # blocking the loop on a fresh RC measurement just to print it
+        if current_time >= self._next_debug_print:
+            ldr_time = self._ldr_ewma if self._ldr_ewma is not None else self._ldr_cache_value
+            # no LDR sample yet (sim/RPi.GPIO measure only on entrance): say so
+            # rather than showing an error and a made-up DARK
+            if ldr_time is None:
+                ldr = "n/a"
+            else:
+                ldr = f"{ldr_time:6.3f}s ({'DARK' if ldr_time > self.ldr_threshold else 'BRIGHT'})"
+            # readers return 500 rather than None on a miss, so sum the deques directly
+            us1_avg = sum(self.us1_readings) / len(self.us1_readings)
+            us2_avg = sum(self.us2_readings) / len(self.us2_readings)
+            logger.info(STATUS_FORMAT.format(
+                us1=us1_distance, us1_avg=us1_avg, us2=us2_distance, us2_avg=us2_avg,
+                ldr=ldr,
+                state=self.state.name,
+                us1_status="🔴 TRIGGERED" if us1_detected else "🟢 NORMAL",
+                us2_status="🔴 TRIGGERED" if us2_detected else "🟢 NORMAL",
+            ))
+            self._next_debug_print = current_time + 3.0
 
         # state machine
         with self.lock:
@@ -309,47 +674,35 @@ class BedroomAutomation:
             self._cancel_exit_timer()
             self.state = RoomState.OCCUPIED
             print("🔄 Movement during exit delay - cancel exit")
+        elif self._now >= self._exit_deadline:
+            self._exit_deadline = None
+            self._turn_off_bedroom_light()
+            self.state = RoomState.EMPTY
+            print("💡 Exit delay completed - lights OFF, room EMPTY")
 
     def _detect_entrance_sequence(self):
-        events = self.last_sensor_events
-        if len(events) < 2:
-            return False
-        for i in range(len(events) - 1):
-            if events[i]['us2'] and events[i+1]['us1'] and (events[i+1]['time'] - events[i]['time'] < 1.0):
-                print(f"🎯 ENTRY SEQ: US2({events[i]['us2_distance']:.1f}cm) -> US1({events[i+1]['us1_distance']:.1f}cm) in {(events[i+1]['time'] - events[i]['time'])*1000:.0f}ms")
-                return True
+        gap = self._last_us1_rise - self._last_us2_rise
+        if 0 < gap < SEQUENCE_MAX_GAP and self._now - self._last_us1_rise < SEQUENCE_WINDOW:
+            print(f"🎯 ENTRY SEQ: US2({self._us2_rise_distance:.1f}cm) -> US1({self._us1_rise_distance:.1f}cm) in {gap*1000:.0f}ms")
+            return True
         return False
 
     def _detect_exit_sequence(self):
-        events = self.last_sensor_events
-        if len(events) < 2:
-            return False
-        for i in range(len(events) - 1):
-            if events[i]['us1'] and events[i+1]['us2'] and (events[i+1]['time'] - events[i]['time'] < 1.0):
-                print(f"🎯 EXIT SEQ: US1({events[i]['us1_distance']:.1f}cm) -> US2({events[i+1]['us2_distance']:.1f}cm) in {(events[i+1]['time'] - events[i]['time'])*1000:.0f}ms")
-                return True
+        gap = self._last_us2_rise - self._last_us1_rise
+        if 0 < gap < SEQUENCE_MAX_GAP and self._now - self._last_us2_rise < SEQUENCE_WINDOW:
+            print(f"🎯 EXIT SEQ: US1({self._us1_rise_distance:.1f}cm) -> US2({self._us2_rise_distance:.1f}cm) in {gap*1000:.0f}ms")
+            return True
         return False
 
     def _start_exit_timer(self):
-        if self.exit_timer and self.exit_timer.is_alive():
+        # counted down by _handle_exiting_state on each loop tick, no extra thread
+        if self._exit_deadline is not None:
             return
-        self.exit_timer = Thread(target=self._exit_delay_countdown, daemon=True)
-        self.exit_timer.start()
-
-    def _exit_delay_countdown(self):
+        self._exit_deadline = self._now + EXIT_DELAY
         print(f"⏰ Exit delay started: {EXIT_DELAY} seconds")
-        for i in range(EXIT_DELAY):
-            time.sleep(1)
-            if not self.running or self.state != RoomState.EXITING:
-                return
-        with self.lock:
-            if self.state == RoomState.EXITING:
-                self._turn_off_bedroom_light()
-                self.state = RoomState.EMPTY
-                print("💡 Exit delay completed - lights OFF, room EMPTY")
 
     def _cancel_exit_timer(self):
-        self.exit_timer = None
+        self._exit_deadline = None
 
     def _turn_on_bedroom_light(self):
         if self.lights:
@@ -382,6 +735,7 @@ def main():
         print("\nStopping automation...")
     finally:
         automation.stop()
+        automation.cleanup()
         if GPIO_AVAILABLE:
             GPIO.cleanup()
 
@@ -9,8 +9,13 @@ Room lights controller with:
 
 from gpiozero import LED, Button
 from gpiozero.pins.pigpio import PiGPIOFactory
+import pigpio
 from signal import pause
-from threading import Timer
+from threading import Thread, Lock, Event
+from queue import Queue
+import heapq
+import logging
+from logging.handlers import QueueHandler, QueueListener
 import sys
 import os
 import time
@@ -19,27 +24,124 @@ import time
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from config.settings import LED_PINS, BUTTON_PINS
 
+logger = logging.getLogger(__name__)
+if logger.level == logging.NOTSET:
+    logger.setLevel(logging.INFO)
+logger.propagate = False  # printed by _LOG_LISTENER; root handlers would print it twice
+
+# messages from button/light handlers go through one QueueHandler on the module
+# logger and are printed by a QueueListener thread, so GPIO callbacks never
+# block on stdout (queue.Queue stays green under eventlet). Both are shared by
+# every controller; the listener runs while at least one controller is alive.
+_console = logging.StreamHandler(sys.stdout)
+_console.setFormatter(logging.Formatter('%(message)s'))
+_LOG_HANDLER = QueueHandler(Queue())
+_LOG_LISTENER = QueueListener(_LOG_HANDLER.queue, _console)
+_LOG_USERS = 0
+_LOG_USERS_LOCK = Lock()
+
+def _acquire_logging():
+    """Attach the shared handler and start its listener for the first controller"""
+    global _LOG_USERS
+    with _LOG_USERS_LOCK:
+        _LOG_USERS += 1
+        if _LOG_USERS == 1:
+            _LOG_LISTENER.start()
+            logger.addHandler(_LOG_HANDLER)
+
+def _release_logging():
+    """Drop one controller's use; flush and stop the listener after the last one"""
+    global _LOG_USERS
+    with _LOG_USERS_LOCK:
+        _LOG_USERS -= 1
+        if _LOG_USERS == 0:
+            logger.removeHandler(_LOG_HANDLER)
+            _LOG_LISTENER.stop()
+
+# pigpiod glitch filter for the buttons: a level must hold this long (us) to count
+BUTTON_DEBOUNCE_US = 50000
+
+# PiGPIOFactory per pigpiod host (None = local), shared by every controller so
+# they reuse one pigpiod socket instead of opening a new one each:
+# host -> [factory, number of controllers using it]
+_PIGPIO_FACTORIES = {}
+_PIGPIO_FACTORIES_LOCK = Lock()
+
+def _acquire_factory(host: str = None):
+    """Return the shared PiGPIOFactory for host, creating it on first use"""
+    with _PIGPIO_FACTORIES_LOCK:
+        entry = _PIGPIO_FACTORIES.get(host)
+        if entry is None:
+            factory = PiGPIOFactory(host=host) if host else PiGPIOFactory()
+            entry = _PIGPIO_FACTORIES[host] = [factory, 0]
+        entry[1] += 1
+        return entry[0]
+
+def _release_factory(host: str, factory):
+    """Drop one controller's use of host's factory; close it after the last one"""
+    with _PIGPIO_FACTORIES_LOCK:
+        entry = _PIGPIO_FACTORIES.get(host)
+        if entry is None or entry[0] is not factory:
+            return
+        entry[1] -= 1
+        if entry[1] > 0:
+            return
+        del _PIGPIO_FACTORIES[host]
+    try:
+        if hasattr(factory, "close"):
+            factory.close()
+    except Exception:
+        pass
+
 class RoomLightsController:
-    def __init__(self, double_click_time: float = 0.4, hold_time: float = 1.0, pigpio_host: str = None, socketio=None):
+    def __init__(self, double_click_time: float = 0.4, hold_time: float = 1.0, pigpio_host: str = None, socketio=None, on_change=None):
         """
         double_click_time: max interval (s) between two presses to count as double-press
         hold_time: seconds to register a hold (when_held)
         pigpio_host: if None -> local pigpiod; else pass host/IP for remote pigpiod
         socketio: SocketIO instance for real-time updates to web clients
+        on_change: optional callable(room, state, source) that takes over publishing
+                   light changes (e.g. to batch them) instead of emitting directly
         """
         self.double_click_time = double_click_time
         self.hold_time = hold_time
         self.socketio = socketio
+        self.on_change = on_change
+
+        _acquire_logging()
 
-        # create a PiGPIOFactory that gpiozero devices will use
+        # shared PiGPIOFactory that gpiozero devices will use
         # If pigpio_host is None, it connects to localhost pigpiod
-        self.factory = PiGPIOFactory(host=pigpio_host) if pigpio_host else PiGPIOFactory()
+        self.pigpio_host = pigpio_host
+        self.factory = _acquire_factory(pigpio_host)
+        self._factory_released = False
 
         self.leds = {}
         self.buttons = {}
-        self.led_states = {}
-        # pending timers for single-press resolution (room -> Timer)
-        self._pending_single_timers = {}
+        # bumped on every state change so callers can cache derived snapshots
+        self.state_version = 0
+        # single presses waiting out the double-click window: room -> deadline,
+        # plus a heap of (deadline, room) served by one scheduler thread;
+        # _lock also guards the light state mask and state_version
+        self._pending_single = {}
+        self._deadlines = []
+        self._lock = Lock()
+        self._sched_event = Event()
+        self._sched_running = True
+        self._sched_thread = Thread(target=self._scheduler_loop, daemon=True)
+        self._sched_thread.start()
+
+        # all LED pins as one bank-1 mask (BCM 0-31) so "all on/off" is a single
+        # pigpiod request instead of one per LED
+        self._pi = getattr(self.factory, 'connection', None)
+        self._all_mask = sum(1 << pin for pin in LED_PINS.values())
+        # light states kept in the same layout: one bit per LED pin
+        self._room_bit = {room: 1 << pin for room, pin in LED_PINS.items()}
+        self._state_mask = 0
+        # button pin -> room, for the shared pigpio edge callback
+        self._button_rooms = {pin: room for room, pin in BUTTON_PINS.items()}
+        # room display names for log messages
+        self._display = {room: room.capitalize() for room in {**LED_PINS, **BUTTON_PINS}}
 
         self.setup_lights()
 
@@ -50,19 +152,28 @@ class RoomLightsController:
         # Create LED objects using the pigpio pin factory
         for room, pin in LED_PINS.items():
             self.leds[room] = LED(pin, pin_factory=self.factory)
-            self.led_states[room] = False
-            print(f"  {room.capitalize():8} - LED on pin {pin}")
+            print(f"  {self._display[room]:8} - LED on pin {pin}")
+        # bound on/off methods per room, so switching is one lookup and a call
+        self._on_funcs = {room: led.on for room, led in self.leds.items()}
+        self._off_funcs = {room: led.off for room, led in self.leds.items()}
 
-        # Create button objects with pull-down resistors using PiGPIOFactory
+        # Buttons: pull-down inputs debounced by pigpiod's glitch filter; edges
+        # (and hold watchdog timeouts) arrive on pigpio's callback thread
         for room, pin in BUTTON_PINS.items():
-            # gpiozero Button: pull_up=False -> internal pull-down; but pigpio supports pull-up/down via factory
-            btn = Button(pin, pull_up=False, bounce_time=0.05, pin_factory=self.factory)
-            btn.hold_time = self.hold_time
-            # wire handlers (use default args to avoid late-binding)
-            btn.when_pressed = lambda r=room: self._on_button_press(r)
-            btn.when_held = lambda r=room: self._on_button_hold(r)
-            self.buttons[room] = btn
-            print(f"  {room.capitalize():8} - Button on pin {pin}")
+            if self._pi is not None:
+                self._pi.set_mode(pin, pigpio.INPUT)
+                self._pi.set_pull_up_down(pin, pigpio.PUD_DOWN)
+                self._pi.set_glitch_filter(pin, BUTTON_DEBOUNCE_US)
+                self.buttons[room] = self._pi.callback(pin, pigpio.EITHER_EDGE, self._on_button_edge)
+            else:
+                # fallback: gpiozero Button with internal pull-down (pull_up=False)
+                btn = Button(pin, pull_up=False, bounce_time=0.05, pin_factory=self.factory)
+                btn.hold_time = self.hold_time
+                # wire handlers (use default args to avoid late-binding)
+                btn.when_pressed = lambda r=room: self._on_button_press(r)
+                btn.when_held = lambda r=room: self._on_button_hold(r)
+                self.buttons[room] = btn
+            print(f"  {self._display[room]:8} - Button on pin {pin}")
 
         print("Room lights controller ready!")
         print("Press buttons to toggle lights. Double-press any button to turn ALL ON.")
@@ -70,43 +181,84 @@ class RoomLightsController:
 
     def emit_light_change(self, room: str, state: bool, source: str = "button"):
         """Emit light change event to all connected web clients"""
-        if self.socketio:
+        if self.on_change:
+            self.on_change(room, state, source)
+        elif self.socketio:
             try:
                 self.socketio.emit('light_changed', {
                     'room': room, 
                     'state': state,
                     'source': source
                 })
-                print(f"📡 Emitted {room} light change to web clients: {state}")
+                logger.info("📡 Emitted %s light change to web clients: %s", room, state)
             except Exception as e:
-                print(f"❌ Error emitting light change: {e}")
+                logger.error("❌ Error emitting light change: %s", e)
 
     # ----- Button event handlers -----
+    def _on_button_edge(self, gpio: int, level: int, tick: int):
+        """
+        pigpio callback for every button pin:
+         - rising edge (level 1): press; arm a watchdog for hold detection
+         - falling edge (level 0): release; disarm the watchdog
+         - watchdog timeout (level 2): no edge for hold_time while pressed -> hold
+        """
+        room = self._button_rooms[gpio]
+        if level == 1:
+            self._pi.set_watchdog(gpio, int(self.hold_time * 1000))
+            self._on_button_press(room)
+        elif level == 0:
+            self._pi.set_watchdog(gpio, 0)
+        elif level == pigpio.TIMEOUT:
+            self._pi.set_watchdog(gpio, 0)
+            if self._pi.read(gpio):
+                self._on_button_hold(room)
+
     def _on_button_press(self, room: str):
         """
-        Called immediately on a physical press. We start a short timer:
-         - if a second press occurs before the timer expires -> treat as double-press
-         - otherwise the timer fires and performs the single-press toggle
+        Called immediately on a physical press. We schedule a short deadline:
+         - if a second press occurs before the deadline -> treat as double-press
+         - otherwise the scheduler thread performs the single-press toggle
         """
-        # If there's already a pending single-press timer for this room, it's the 2nd press
-        timer = self._pending_single_timers.get(room)
-        if timer and timer.is_alive():
+        now = time.monotonic()
+        with self._lock:
+            deadline = self._pending_single.pop(room, None)
+            double = deadline is not None and now < deadline
+            if not double:
+                deadline_new = now + self.double_click_time
+                self._pending_single[room] = deadline_new
+                heapq.heappush(self._deadlines, (deadline_new, room))
+        if double:
             # second press within double-click interval -> double-press
-            timer.cancel()
-            del self._pending_single_timers[room]
             self._handle_double_press(room)
-        else:
-            # start a timer that will execute the single-press action after double_click_time
-            t = Timer(self.double_click_time, lambda: self._single_press_action(room))
-            self._pending_single_timers[room] = t
-            t.start()
+            return
+        if deadline is not None:
+            # the previous press was due but the scheduler hadn't run it yet
+            self._single_press_action(room)
+        self._sched_event.set()
+
+    def _scheduler_loop(self):
+        """Run single-press actions as their double-click windows expire."""
+        while self._sched_running:
+            due = []
+            with self._lock:
+                now = time.monotonic()
+                while self._deadlines and self._deadlines[0][0] <= now:
+                    deadline, room = heapq.heappop(self._deadlines)
+                    # skip entries superseded by a double-press or a cancel
+                    if self._pending_single.get(room) == deadline:
+                        del self._pending_single[room]
+                        due.append(room)
+                timeout = self._deadlines[0][0] - now if self._deadlines else None
+                self._sched_event.clear()
+            for room in due:
+                try:
+                    self._single_press_action(room)
+                except Exception as e:
+                    logger.error("❌ Error handling press on '%s': %s", room, e)
+            self._sched_event.wait(timeout)
 
     def _single_press_action(self, room: str):
         """Execute the single-press behavior (toggle the room's light)."""
-        # remove pending timer entry if present
-        if room in self._pending_single_timers:
-            del self._pending_single_timers[room]
-
         self.toggle_light(room)
 
     def _handle_double_press(self, room: str):
@@ -114,50 +266,45 @@ class RoomLightsController:
         # Cancel any pending single-press timers for all rooms to avoid race conditions
         self._cancel_all_pending_timers()
         self.all_lights_on()
-        print(f"Double-press detected on '{room}' -> ALL lights ON")
+        logger.info("Double-press detected on '%s' -> ALL lights ON", room)
 
     def _on_button_hold(self, room: str):
         """Hold any button -> turn ALL lights OFF immediately"""
         # Cancel any pending single-press timers (so a hold doesn't later trigger a single-press)
         self._cancel_all_pending_timers()
         self.all_lights_off()
-        print(f"Hold detected on '{room}' -> ALL lights OFF")
+        logger.info("Hold detected on '%s' -> ALL lights OFF", room)
 
     def _cancel_all_pending_timers(self):
-        """Cancel and clear all pending single-press timers."""
-        for r, t in list(self._pending_single_timers.items()):
-            try:
-                t.cancel()
-            except Exception:
-                pass
-        self._pending_single_timers.clear()
+        """Cancel and clear all pending single-press actions."""
+        with self._lock:
+            self._pending_single.clear()
+            self._deadlines.clear()
 
     # ----- Light control methods -----
     def toggle_light(self, room: str, source: str = "button"):
         """Toggle a specific room's light"""
-        current_state = self.led_states.get(room, False)
-        new_state = not current_state
-
-        if new_state:
-            self.leds[room].on()
-        else:
-            self.leds[room].off()
-
-        self.led_states[room] = new_state
-        print(f"{room.capitalize()} light turned {'ON' if new_state else 'OFF'} (via {source})")
+        # handlers run on several threads; the pin write and mask update must not interleave
+        with self._lock:
+            self._state_mask ^= self._room_bit[room]
+            new_state = bool(self._state_mask & self._room_bit[room])
+            (self._on_funcs if new_state else self._off_funcs)[room]()
+            self.state_version += 1
+        logger.info("%s light turned %s (via %s)", self._display[room], 'ON' if new_state else 'OFF', source)
         
         # Emit the change to web clients
         self.emit_light_change(room, new_state, source)
 
     def set_light(self, room: str, state: bool, source: str = "system"):
         """Set a specific room's light state"""
-        if state:
-            self.leds[room].on()
-        else:
-            self.leds[room].off()
-
-        self.led_states[room] = state
-        print(f"{room.capitalize()} light turned {'ON' if state else 'OFF'} (via {source})")
+        with self._lock:
+            (self._on_funcs if state else self._off_funcs)[room]()
+            if state:
+                self._state_mask |= self._room_bit[room]
+            else:
+                self._state_mask &= ~self._room_bit[room]
+            self.state_version += 1
+        logger.info("%s light turned %s (via %s)", self._display[room], 'ON' if state else 'OFF', source)
         
         # Emit the change to web clients
         self.emit_light_change(room, state, source)
@@ -165,24 +312,52 @@ class RoomLightsController:
 
     def get_light_state(self, room: str):
         """Get current light state"""
-        return self.led_states.get(room, False)
+        return bool(self._state_mask & self._room_bit.get(room, 0))
+
+    def get_all_states(self):
+        """Get a copy of every room's light state in one call"""
+        mask = self._state_mask
+        return {room: bool(mask & bit) for room, bit in self._room_bit.items()}
+
+    @property
+    def led_states(self):
+        """Per-room light states as a dict (derived from the state bitmask)"""
+        return self.get_all_states()
+
+    def _set_all_lights(self, state: bool, source: str):
+        """Switch every LED with one pigpio bank write, then record and publish each room"""
+        if self._pi is None:
+            for room in self.leds:
+                self.set_light(room, state, source)
+            return
+        with self._lock:
+            if state:
+                self._pi.set_bank_1(self._all_mask)
+            else:
+                self._pi.clear_bank_1(self._all_mask)
+            self._state_mask = self._all_mask if state else 0
+            self.state_version += 1
+        for room in self.leds:
+            logger.info("%s light turned %s (via %s)", self._display[room], 'ON' if state else 'OFF', source)
+            self.emit_light_change(room, state, source)
 
     def all_lights_off(self, source: str = "button"):
         """Turn all lights off"""
-        for room in self.leds:
-            self.set_light(room, False, source)
-        print("All lights turned OFF")
+        self._set_all_lights(False, source)
+        logger.info("All lights turned OFF")
 
     def all_lights_on(self, source: str = "button"):
         """Turn all lights on"""
-        for room in self.leds:
-            self.set_light(room, True, source)
-        print("All lights turned ON")
+        self._set_all_lights(True, source)
+        logger.info("All lights turned ON")
 
     # ----- Cleanup -----
     def cleanup(self):
         """Clean up GPIO resources and timers"""
         self._cancel_all_pending_timers()
+        self._sched_running = False
+        self._sched_event.set()
+        self._sched_thread.join(timeout=1.0)
         # turn off lights and close gpiozero devices
         self.all_lights_off()
         for led in self.leds.values():
@@ -190,19 +365,24 @@ class RoomLightsController:
                 led.close()
             except Exception:
                 pass
-        for btn in self.buttons.values():
+        for room, btn in self.buttons.items():
             try:
-                btn.close()
+                if self._pi is not None:
+                    btn.cancel()
+                    pin = BUTTON_PINS[room]
+                    self._pi.set_watchdog(pin, 0)
+                    self._pi.set_glitch_filter(pin, 0)
+                else:
+                    btn.close()
             except Exception:
                 pass
 
-        # Attempt to close/cleanup the factory if available (no-op if not)
-        try:
-            if hasattr(self.factory, "close"):
-                self.factory.close()
-        except Exception:
-            pass
-
+        # Release the shared factory and log listener; each is closed once no
+        # controller uses it (flushing queued messages before reporting completion)
+        if not self._factory_released:
+            self._factory_released = True
+            _release_factory(self.pigpio_host, self.factory)
+            _release_logging()
         print("GPIO cleanup completed")
 
 def main():
@@ -23,6 +23,22 @@ socket.on('light_changed', function(data) {
     updateLastUpdate();
 });
 
+// Handle a burst of light changes coalesced by the server
+socket.on('lights_batch', function(data) {
+    for (const change of data.changes) {
+        updateLightIndicator(change.room, change.state, change.source);
+    }
+    updateLastUpdate();
+});
+
+// Handle the full light state snapshot sent on connect
+socket.on('lights_snapshot', function(data) {
+    for (const [room, state] of Object.entries(data.states)) {
+        updateLightIndicator(room, state, data.source);
+    }
+    updateLastUpdate();
+});
+
 // Update connection status UI
 function updateConnectionStatus(status, text) {
     const statusElement = document.getElementById('connection-status');
@@ -4,9 +4,20 @@ Ultrasonic Sensor Distance Measurement Test
 Tests both ultrasonic sensors separately to verify wiring and functionality
 """
 
+import argparse
+import sys
 import time
+import statistics
+from threading import Event
 import RPi.GPIO as GPIO
 
+# pigpio (if pigpiod is running) sends a daemon-timed trigger pulse and
+# timestamps the echo edges, instead of sleep() and Python polling
+try:
+    import pigpio
+except ImportError:
+    pigpio = None
+
 # Sensor configuration - using your actual pins
 SENSOR_CONFIG = {
     # Ultrasonic Sensor 1 (Top - inside room detection)
@@ -18,8 +29,55 @@ SENSOR_CONFIG = {
     'us2_echo': 12,
 }
 
+ECHO_TIMEOUT = 0.04  # seconds; a no-obstacle echo is ~38ms long
+MIN_READING_GAP = 0.06  # seconds between pings so late echoes can die out
+
+pi = None
+echo_rise = {}
+echo_fall = {}
+echo_done = {}
+callbacks = []
+
+def on_echo_edge(gpio, level, tick):
+    """pigpio callback: record echo edge ticks (microseconds)"""
+    if level == 1:
+        echo_rise[gpio] = tick
+    elif level == 0:
+        echo_fall[gpio] = tick
+        echo_done[gpio].set()
+
+def setup_pigpio():
+    """Use pigpiod for both sensors if it is running; returns True on success"""
+    global pi
+    if pigpio is None:
+        return False
+    pi = pigpio.pi()
+    if not pi.connected:
+        pi = None
+        return False
+    for trigger in (SENSOR_CONFIG['us1_trigger'], SENSOR_CONFIG['us2_trigger']):
+        pi.set_mode(trigger, pigpio.OUTPUT)
+        pi.write(trigger, 0)
+    for echo in (SENSOR_CONFIG['us1_echo'], SENSOR_CONFIG['us2_echo']):
+        pi.set_mode(echo, pigpio.INPUT)
+        echo_done[echo] = Event()
+        callbacks.append(pi.callback(echo, pigpio.EITHER_EDGE, on_echo_edge))
+    time.sleep(0.5)
+    print("✅ pigpio setup complete")
+    return True
+
+def cleanup_gpio():
+    if pi is not None:
+        for cb in callbacks:
+            cb.cancel()
+        pi.stop()
+    else:
+        GPIO.cleanup()
+
 def setup_gpio():
     """Initialize GPIO pins for both sensors"""
+    if setup_pigpio():
+        return
     GPIO.setmode(GPIO.BCM)
     
     # Setup Sensor 1
@@ -42,27 +100,29 @@ def measure_distance(trigger_pin, echo_pin, sensor_name):
     Measure distance from a single ultrasonic sensor
     Returns distance in cm, or -1 if error
     """
+    if pi is not None:
+        return measure_distance_pigpio(trigger_pin, echo_pin)
     try:
         # Send 10us trigger pulse
         GPIO.output(trigger_pin, True)
         time.sleep(0.00001)  # 10 microseconds
         GPIO.output(trigger_pin, False)
         
-        start_time = time.time()
-        stop_time = time.time()
+        # one monotonic clock read per poll, checked against a fixed deadline
+        start_time = stop_time = time.perf_counter()
         
-        # Wait for echo to go HIGH (with timeout)
-        timeout_start = time.time()
+        # Wait for echo to go HIGH (with 100ms timeout)
+        deadline = start_time + 0.1
         while GPIO.input(echo_pin) == 0:
-            start_time = time.time()
-            if time.time() - timeout_start > 0.1:  # 100ms timeout
+            start_time = time.perf_counter()
+            if start_time > deadline:
                 return -1, "Timeout waiting for echo HIGH"
         
-        # Wait for echo to go LOW (with timeout)  
-        timeout_start = time.time()
+        # Wait for echo to go LOW (with 100ms timeout)
+        deadline = start_time + 0.1
         while GPIO.input(echo_pin) == 1:
-            stop_time = time.time()
-            if time.time() - timeout_start > 0.1:  # 100ms timeout
+            stop_time = time.perf_counter()
+            if stop_time > deadline:
                 return -1, "Timeout waiting for echo LOW"
         
         # Calculate distance (speed of sound = 34300 cm/s)
@@ -80,6 +140,22 @@ def measure_distance(trigger_pin, echo_pin, sensor_name):
     except Exception as e:
         return -1, f"Error: {str(e)}"
 
+def measure_distance_pigpio(trigger_pin, echo_pin):
+    """10us trigger pulse timed by pigpiod; echo width from its edge ticks"""
+    echo_done[echo_pin].clear()
+    echo_rise.pop(echo_pin, None)
+    pi.gpio_trigger(trigger_pin, 10, 1)
+    if not echo_done[echo_pin].wait(ECHO_TIMEOUT) or echo_pin not in echo_rise:
+        return -1, "Timeout waiting for echo"
+    distance = pigpio.tickDiff(echo_rise[echo_pin], echo_fall[echo_pin]) * 34300 / 2e6
+
+    # Filter out obviously wrong readings
+    if distance > 400:  # Max reasonable distance
+        return -1, "Distance too large (>400cm)"
+    if distance < 2:    # Min reasonable distance
+        return -1, "Distance too small (<2cm)"
+    return round(distance, 1), "Success"
+
 def test_single_sensor(trigger_pin, echo_pin, sensor_name, num_readings=10):
     """Test a single ultrasonic sensor with multiple readings"""
     print(f"\n{'='*50}")
@@ -100,33 +176,37 @@ def test_single_sensor(trigger_pin, echo_pin, sensor_name, num_readings=10):
         else:
             print(f"  Reading {i+1:2d}: Failed - {status} ❌")
         
-        time.sleep(0.5)  # Wait between readings
+        time.sleep(MIN_READING_GAP)  # Wait between readings
     
     # Print statistics
     if successful_readings > 0:
-        avg_distance = sum(readings) / len(readings)
+        avg_distance = statistics.fmean(readings)
         min_distance = min(readings)
         max_distance = max(readings)
+        spread = statistics.pstdev(readings, avg_distance)
         
         print(f"\n📊 {sensor_name} Results:")
         print(f"   Successful readings: {successful_readings}/{num_readings}")
         print(f"   Average distance: {avg_distance:.1f} cm")
         print(f"   Range: {min_distance:.1f} - {max_distance:.1f} cm")
-        print(f"   Stability: ±{max_distance - avg_distance:.1f} cm")
+        print(f"   Stability: ±{spread:.1f} cm (std dev)")
     else:
         print(f"\n❌ {sensor_name} - All readings failed!")
     
     return successful_readings
 
-def continuous_monitoring():
-    """Continuously monitor both sensors"""
+def continuous_monitoring(num_readings=None, hz=1.0):
+    """Continuously monitor both sensors at hz updates/s (num_readings=None runs until Ctrl+C)"""
+    interval = max(1.0 / hz, MIN_READING_GAP)
     print(f"\n{'='*60}")
     print("📡 Continuous Monitoring Mode")
     print("Press Ctrl+C to stop monitoring")
     print(f"{'='*60}")
     
     try:
-        while True:
+        count = 0
+        while num_readings is None or count < num_readings:
+            count += 1
             # Test Sensor 1
             dist1, status1 = measure_distance(
                 SENSOR_CONFIG['us1_trigger'], 
@@ -134,6 +214,10 @@ def continuous_monitoring():
                 "US1"
             )
             
+            # the sensors face the same doorway: let US1's burst die out
+            # before pinging US2, or each hears the other's echo
+            time.sleep(MIN_READING_GAP)
+            
             # Test Sensor 2
             dist2, status2 = measure_distance(
                 SENSOR_CONFIG['us2_trigger'], 
@@ -147,7 +231,7 @@ def continuous_monitoring():
             
             print(f"US1 (Top): {us1_status} | US2 (Side): {us2_status}")
             
-            time.sleep(1)  # Update every second
+            time.sleep(interval)
             
     except KeyboardInterrupt:
         print("\n🛑 Continuous monitoring stopped")
@@ -185,14 +269,82 @@ GPIO_TO_PHYSICAL = {
     12: 32,  # GPIO12 → Physical pin 32
 }
 
+def run_mode(mode, num_readings=None, hz=1.0):
+    """Run one test mode; num_readings=None uses the mode's default"""
+    if mode == 'us1':
+        test_single_sensor(
+            SENSOR_CONFIG['us1_trigger'],
+            SENSOR_CONFIG['us1_echo'],
+            "Ultrasonic Sensor 1 (Top - US1)",
+            num_readings or 10
+        )
+        
+    elif mode == 'us2':
+        test_single_sensor(
+            SENSOR_CONFIG['us2_trigger'],
+            SENSOR_CONFIG['us2_echo'],
+            "Ultrasonic Sensor 2 (Side - US2)", 
+            num_readings or 10
+        )
+        
+    elif mode == 'both':
+        n = num_readings or 5
+        print("\n🧪 Testing both sensors sequentially...")
+        success1 = test_single_sensor(
+            SENSOR_CONFIG['us1_trigger'],
+            SENSOR_CONFIG['us1_echo'],
+            "Ultrasonic Sensor 1 (Top - US1)",
+            n
+        )
+        success2 = test_single_sensor(
+            SENSOR_CONFIG['us2_trigger'],
+            SENSOR_CONFIG['us2_echo'],
+            "Ultrasonic Sensor 2 (Side - US2)",
+            n
+        )
+        
+        print(f"\n📋 Overall Results:")
+        print(f"   Sensor 1: {success1}/{n} successful readings")
+        print(f"   Sensor 2: {success2}/{n} successful readings")
+        
+    elif mode == 'monitor':
+        continuous_monitoring(num_readings, hz)
+        
+    elif mode == 'wiring':
+        wiring_check()
+
+# menu choices -> run_mode() modes
+MENU_MODES = {'1': 'us1', '2': 'us2', '3': 'both', '4': 'monitor', '5': 'wiring'}
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Ultrasonic sensor distance measurement test")
+    parser.add_argument('--mode', choices=['us1', 'us2', 'both', 'monitor', 'wiring'],
+                        help="run one test and exit instead of showing the menu")
+    parser.add_argument('--n', type=int, metavar='READINGS',
+                        help="number of readings (default: 10 per sensor, 5 for both, monitor runs until Ctrl+C)")
+    parser.add_argument('--hz', type=float, default=1.0,
+                        help="continuous monitoring update rate (default: 1)")
+    args = parser.parse_args()
+    if args.mode is None and not sys.stdin.isatty():
+        parser.error("--mode is required when stdin is not a terminal")
+    if args.hz <= 0:
+        parser.error("--hz must be positive")
+    return args
+
 def main():
     """Main test program"""
+    args = parse_args()
     print("🚀 Ultrasonic Sensor Distance Measurement Test")
     print("This script will test both ultrasonic sensors separately")
     
     try:
         setup_gpio()
         
+        if args.mode:
+            # one-shot run for scripted use, e.g. --mode monitor --n 100 > readings.log
+            run_mode(args.mode, args.n, args.hz)
+            return
+        
         while True:
             print(f"\n{'='*60}")
             print("Select test mode:")
@@ -206,46 +358,8 @@ def main():
             
             choice = input("Enter choice (0-5): ").strip()
             
-            if choice == '1':
-                test_single_sensor(
-                    SENSOR_CONFIG['us1_trigger'],
-                    SENSOR_CONFIG['us1_echo'],
-                    "Ultrasonic Sensor 1 (Top - US1)",
-                    10
-                )
-                
-            elif choice == '2':
-                test_single_sensor(
-                    SENSOR_CONFIG['us2_trigger'],
-                    SENSOR_CONFIG['us2_echo'],
-                    "Ultrasonic Sensor 2 (Side - US2)", 
-                    10
-                )
-                
-            elif choice == '3':
-                print("\n🧪 Testing both sensors sequentially...")
-                success1 = test_single_sensor(
-                    SENSOR_CONFIG['us1_trigger'],
-                    SENSOR_CONFIG['us1_echo'],
-                    "Ultrasonic Sensor 1 (Top - US1)",
-                    5
-                )
-                success2 = test_single_sensor(
-                    SENSOR_CONFIG['us2_trigger'],
-                    SENSOR_CONFIG['us2_echo'],
-                    "Ultrasonic Sensor 2 (Side - US2)",
-                    5
-                )
-                
-                print(f"\n📋 Overall Results:")
-                print(f"   Sensor 1: {success1}/5 successful readings")
-                print(f"   Sensor 2: {success2}/5 successful readings")
-                
-            elif choice == '4':
-                continuous_monitoring()
-                
-            elif choice == '5':
-                wiring_check()
+            if choice in MENU_MODES:
+                run_mode(MENU_MODES[choice], args.n, args.hz)
                 
             elif choice == '0':
                 print("👋 Exiting test program")
@@ -261,8 +375,8 @@ def main():
     except Exception as e:
         print(f"\n❌ Unexpected error: {e}")
     finally:
-        GPIO.cleanup()
+        cleanup_gpio()
         print("🧹 GPIO cleanup complete")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
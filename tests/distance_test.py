@@ -4,15 +4,51 @@ Quick Ultrasonic Sensor Test - Single run
 """
 
 import time
+from threading import Event
 import RPi.GPIO as GPIO
 
+# pigpio (if pigpiod is running) times the echo in the daemon instead of a Python loop
+try:
+    import pigpio
+except ImportError:
+    pigpio = None
+
 # Sensor pins
 SENSORS = [
     {'name': 'US1 (Top)', 'trigger': 23, 'echo': 24},
     {'name': 'US2 (Side)', 'trigger': 25, 'echo': 12}
 ]
 
+ECHO_TIMEOUT = 0.04  # seconds; a no-obstacle echo is ~38ms long
+MIN_READING_GAP = 0.06  # seconds between pings so late echoes can die out
+
+pi = None
+echo_rise = {}
+echo_fall = {}
+echo_done = {}
+callbacks = []
+
+def on_echo_edge(gpio, level, tick):
+    if level == 1:
+        echo_rise[gpio] = tick
+    elif level == 0:
+        echo_fall[gpio] = tick
+        echo_done[gpio].set()
+
 def setup_gpio():
+    global pi
+    if pigpio is not None:
+        pi = pigpio.pi()
+        if pi.connected:
+            for sensor in SENSORS:
+                pi.set_mode(sensor['trigger'], pigpio.OUTPUT)
+                pi.write(sensor['trigger'], 0)
+                pi.set_mode(sensor['echo'], pigpio.INPUT)
+                echo_done[sensor['echo']] = Event()
+                callbacks.append(pi.callback(sensor['echo'], pigpio.EITHER_EDGE, on_echo_edge))
+            time.sleep(0.5)
+            return
+        pi = None
     GPIO.setmode(GPIO.BCM)
     for sensor in SENSORS:
         GPIO.setup(sensor['trigger'], GPIO.OUT)
@@ -21,25 +57,27 @@ def setup_gpio():
     time.sleep(0.5)
 
 def quick_measure(trigger, echo):
+    if pi is not None:
+        return quick_measure_pigpio(trigger, echo)
     try:
         GPIO.output(trigger, True)
         time.sleep(0.00001)
         GPIO.output(trigger, False)
         
-        start = time.time()
+        start = time.perf_counter()
         timeout = start + 0.1
         
         while GPIO.input(echo) == 0:
-            start = time.time()
-            if time.time() > timeout:
+            start = time.perf_counter()
+            if start > timeout:
                 return -1
         
-        stop = time.time()
+        stop = start
         timeout = stop + 0.1
         
         while GPIO.input(echo) == 1:
-            stop = time.time()
-            if time.time() > timeout:
+            stop = time.perf_counter()
+            if stop > timeout:
                 return -1
         
         distance = ((stop - start) * 34300) / 2
@@ -48,6 +86,24 @@ def quick_measure(trigger, echo):
     except:
         return -1
 
+def quick_measure_pigpio(trigger, echo):
+    """10us trigger pulse timed by pigpiod, echo width from its edge ticks."""
+    echo_done[echo].clear()
+    echo_rise.pop(echo, None)
+    pi.gpio_trigger(trigger, 10, 1)
+    if not echo_done[echo].wait(ECHO_TIMEOUT) or echo not in echo_rise:
+        return -1
+    distance = pigpio.tickDiff(echo_rise[echo], echo_fall[echo]) * 34300 / 2e6
+    return round(distance, 1) if 2 < distance < 400 else -1
+
+def cleanup_gpio():
+    if pi is not None:
+        for cb in callbacks:
+            cb.cancel()
+        pi.stop()
+    else:
+        GPIO.cleanup()
+
 def main():
     print("🚀 Quick Ultrasonic Test")
     print("=" * 40)
@@ -68,14 +124,14 @@ def main():
                 print(f"   Reading {i+1}: {dist} cm ✅")
             else:
                 print(f"   Reading {i+1}: Failed ❌")
-            time.sleep(0.5)
+            time.sleep(MIN_READING_GAP)
         
         if readings:
             avg = sum(readings) / len(readings)
             print(f"   Average: {avg:.1f} cm")
         print()
     
-    GPIO.cleanup()
+    cleanup_gpio()
     print("✅ Test complete!")
 
 if __name__ == "__main__":
@@ -6,11 +6,13 @@ Sensor Tuner / Calibrator (RC LDR boolean + Ultrasonics)
 Run with: sudo python3 sensor_tuner_rc.py
 """
 
+import argparse
 import csv
+import sys
 import time
-import os
 import statistics
 from datetime import datetime
+from threading import Thread, Event
 
 # Try hardware imports
 try:
@@ -20,6 +22,12 @@ except ImportError:
     GPIO_AVAILABLE = False
     print("⚠️ RPi.GPIO not available — running in SIMULATION MODE")
 
+# pigpio (if pigpiod is running) times ultrasonic echoes from its edge ticks
+try:
+    import pigpio
+except ImportError:
+    pigpio = None
+
 # --- CONFIG (change if needed) ---
 BEDROOM_SENSORS = {
     'us1_trigger': 23,
@@ -33,18 +41,58 @@ BEDROOM_SENSORS = {
 # Tunable collection parameters
 DEFAULT_SAMPLES = 120
 DEFAULT_DELAY = 0.08  # seconds between samples
+AUTO_START_COUNTDOWN = 3  # seconds counted down before an unattended (--auto) collection
+SENSOR_KEYS = ('us1', 'us2', 'ldr')
 TIMEOUT_SEC = 0.12    # ultrasonic echo timeout
+CLOCK_CHECK_MASK = 0x3FF  # echo polls read the clock for the timeout once per 1024 passes
 
 # RC timing parameters (tune if needed)
 RC_TIMEOUT = 2.0      # seconds: maximum wait for cap to charge (s)
 RC_DISCHARGE_MS = 10  # ms to hold pin low to discharge cap
+LDR_STABLE_SAMPLES = 3       # measure_ldr_median stops once this many readings...
+LDR_STABLE_TOLERANCE = 0.02  # ...lie within this fraction of their median
+
+pi = None
+echo_rise = {}
+echo_fall = {}
+echo_done = {}
+callbacks = []
 
 # ----- GPIO helpers -----
+def on_echo_edge(gpio, level, tick):
+    if level == 1:
+        echo_rise[gpio] = tick
+    elif level == 0:
+        echo_fall[gpio] = tick
+        echo_done[gpio].set()
+
+def setup_pigpio():
+    """Connect to pigpiod and watch both echo pins; False if it isn't running"""
+    global pi
+    if pi is not None:
+        return True
+    if pigpio is None:
+        return False
+    conn = pigpio.pi()
+    if not conn.connected:
+        return False
+    pi = conn
+    for trig, echo in (('us1_trigger', 'us1_echo'), ('us2_trigger', 'us2_echo')):
+        pi.set_mode(BEDROOM_SENSORS[trig], pigpio.OUTPUT)
+        pi.write(BEDROOM_SENSORS[trig], 0)
+        pi.set_mode(BEDROOM_SENSORS[echo], pigpio.INPUT)
+        echo_done[BEDROOM_SENSORS[echo]] = Event()
+        callbacks.append(pi.callback(BEDROOM_SENSORS[echo], pigpio.EITHER_EDGE, on_echo_edge))
+    return True
+
 def setup_gpio():
     if not GPIO_AVAILABLE:
         return
     GPIO.setwarnings(False)
     GPIO.setmode(GPIO.BCM)
+    if setup_pigpio():
+        # ultrasonics are driven by pigpiod; only the LDR uses RPi.GPIO
+        return
     # Ultrasonic pins
     GPIO.setup(BEDROOM_SENSORS['us1_trigger'], GPIO.OUT)
     GPIO.setup(BEDROOM_SENSORS['us1_echo'], GPIO.IN)
@@ -56,10 +104,49 @@ def setup_gpio():
     time.sleep(0.1)
 
 def cleanup_gpio():
+    global pi
+    if pi is not None:
+        for cb in callbacks:
+            cb.cancel()
+        callbacks.clear()
+        pi.stop()
+        pi = None
     if GPIO_AVAILABLE:
         GPIO.cleanup()
 
-# ----- Ultrasonic reading (unchanged) -----
+# ----- Ultrasonic reading -----
+def _time_echo(echo_pin):
+    """Poll the echo's rising then falling edge; return its length (s) or None on timeout.
+
+    A tight poll, not GPIO.wait_for_edge: the edge-event wakeup adds scheduler
+    latency to each timestamp, which swamps a 58us-per-cm echo. The timeout is
+    only checked every CLOCK_CHECK_MASK + 1 passes, so each loop pass is just a
+    GPIO read; each edge is stamped once, right after its loop exits.
+    """
+    timeout = time.monotonic() + TIMEOUT_SEC
+    i = 0
+    while GPIO.input(echo_pin) == 0:
+        i += 1
+        if (i & CLOCK_CHECK_MASK) == 0 and time.monotonic() > timeout:
+            return None
+    t_start = time.monotonic()
+    timeout = t_start + TIMEOUT_SEC
+    i = 0
+    while GPIO.input(echo_pin) == 1:
+        i += 1
+        if (i & CLOCK_CHECK_MASK) == 0 and time.monotonic() > timeout:
+            return None
+    return time.monotonic() - t_start
+
+def read_ultrasonic_pigpio(trigger_pin, echo_pin):
+    """10us trigger pulse timed by pigpiod, echo width from its edge ticks"""
+    echo_done[echo_pin].clear()
+    echo_rise.pop(echo_pin, None)
+    pi.gpio_trigger(trigger_pin, 10, 1)
+    if not echo_done[echo_pin].wait(TIMEOUT_SEC) or echo_pin not in echo_rise:
+        return None
+    return pigpio.tickDiff(echo_rise[echo_pin], echo_fall[echo_pin]) * 34300 / 2e6
+
 def read_ultrasonic(trigger_pin, echo_pin):
     if not GPIO_AVAILABLE:
         # simulation
@@ -68,25 +155,17 @@ def read_ultrasonic(trigger_pin, echo_pin):
             return 40.0 if (int(t) % 15) in (2,3,4,5) else 250.0
         else:
             return 40.0 if (int(t) % 7) == 1 else 300.0
+    if pi is not None:
+        return read_ultrasonic_pigpio(trigger_pin, echo_pin)
 
     try:
         GPIO.output(trigger_pin, True)
         time.sleep(0.00001)
         GPIO.output(trigger_pin, False)
 
-        t_start = time.monotonic()
-        timeout = t_start + TIMEOUT_SEC
-        while GPIO.input(echo_pin) == 0:
-            t_start = time.monotonic()
-            if t_start > timeout:
-                return None
-        t_stop = time.monotonic()
-        timeout = t_stop + TIMEOUT_SEC
-        while GPIO.input(echo_pin) == 1:
-            t_stop = time.monotonic()
-            if t_stop > timeout:
-                return None
-        elapsed = t_stop - t_start
+        elapsed = _time_echo(echo_pin)
+        if elapsed is None:
+            return None
         distance = (elapsed * 34300) / 2.0
         return float(distance)
     except Exception as e:
@@ -120,21 +199,29 @@ def measure_ldr_charge_time(timeout=RC_TIMEOUT):
         # set to input and measure
         GPIO.setup(gpio, GPIO.IN)
         start = time.monotonic()
-        deadline = start + timeout
-        while time.monotonic() < deadline:
-            if GPIO.input(gpio) == GPIO.HIGH:
-                return time.monotonic() - start
+        # sleep in the kernel until the node crosses HIGH instead of polling
+        # (a very bright LDR may already read HIGH before the wait is armed)
+        if GPIO.input(gpio) == GPIO.HIGH or \
+                GPIO.wait_for_edge(gpio, GPIO.RISING, timeout=int(timeout * 1000)) is not None:
+            return time.monotonic() - start
         return None
     except Exception as e:
         print("LDR measure error:", e)
         return None
 
-def measure_ldr_median(samples=7, delay=0.05):
+def measure_ldr_median(samples=7, delay=0.05, stop_when_stable=False):
+    """Median of up to `samples` charge times; stop_when_stable trades samples for speed
+    (as few as LDR_STABLE_SAMPLES), so leave it off when the median feeds calibration."""
     vals = []
     for _ in range(samples):
         v = measure_ldr_charge_time()
         if v is not None:
             vals.append(v)
+            # stop early once the last few readings agree: the light is steady
+            recent = vals[-LDR_STABLE_SAMPLES:]
+            if stop_when_stable and len(recent) == LDR_STABLE_SAMPLES and \
+                    max(recent) - min(recent) <= LDR_STABLE_TOLERANCE * statistics.median(recent):
+                break
         time.sleep(delay)
     if not vals:
         return None
@@ -144,7 +231,8 @@ def measure_ldr_median(samples=7, delay=0.05):
 # threshold_seconds should be tuned with calibration helper below
 DEFAULT_LDR_THRESHOLD = 0.12  # seconds (example start; calibrate this)
 def read_ldr_bool(threshold_seconds=DEFAULT_LDR_THRESHOLD):
-    m = measure_ldr_median()
+    # a quick dark/bright check, not calibration: a steady early median will do
+    m = measure_ldr_median(stop_when_stable=True)
     if m is None:
         # treat timeout as dark (safe default) or False depending on preference — choose dark
         return True, None
@@ -152,17 +240,30 @@ def read_ldr_bool(threshold_seconds=DEFAULT_LDR_THRESHOLD):
 
 # ----- CSV helpers (unchanged) -----
 def filename_for(sensor_key, mode):
-    ts = datetime.now().strftime("%Y%m%d_%H%M%S")
+    ts = time.strftime("%Y%m%d_%H%M%S")
     return f"samples_{sensor_key}_{mode}_{ts}.csv"
 
+def _sample_rows(samples):
+    """CSV rows for (unix_time, value) samples; the local date/time part of the ISO
+    stamp is formatted once per second rather than building a datetime per row"""
+    last_sec = prefix = None
+    for t, v in samples:
+        sec = int(t)
+        usec = round((t - sec) * 1e6)
+        if usec >= 1000000:
+            sec, usec = sec + 1, usec - 1000000
+        if sec != last_sec:
+            prefix = time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(sec))
+            last_sec = sec
+        yield f"{prefix}.{usec:06d}", f"{t:.6f}", "" if v is None else f"{v}"
+
 def save_csv(samples, sensor_key, mode):
     fn = filename_for(sensor_key, mode)
-    with open(fn, 'w', newline='') as f:
+    with open(fn, 'w', newline='', buffering=1 << 20) as f:
         w = csv.writer(f)
         # for LDR we store raw time (seconds) as value
         w.writerow(['timestamp_iso', 'unix_time', 'value'])
-        for t, v in samples:
-            w.writerow([datetime.fromtimestamp(t).isoformat(), f"{t:.6f}", "" if v is None else f"{v}"])
+        w.writerows(_sample_rows(samples))
     return fn
 
 def load_csv(fn):
@@ -188,17 +289,17 @@ def stats_from_list(values):
     clean = [v for v in values if v is not None]
     if not clean:
         return None
-    s = {}
-    s['count'] = len(clean)
-    s['min'] = min(clean)
-    s['max'] = max(clean)
-    s['mean'] = statistics.mean(clean)
-    s['median'] = statistics.median(clean)
-    s['stdev'] = statistics.stdev(clean) if len(clean) > 1 else 0.0
+    # sort once; min/max/median/percentiles all read from the sorted list
     clean_sorted = sorted(clean)
+    mean = statistics.fmean(clean_sorted)
+    s = {}
+    s['count'] = len(clean_sorted)
+    s['min'] = clean_sorted[0]
+    s['max'] = clean_sorted[-1]
+    s['mean'] = mean
+    s['median'] = statistics.median(clean_sorted)
+    s['stdev'] = statistics.stdev(clean_sorted, mean) if len(clean_sorted) > 1 else 0.0
     def percentile(p):
-        if not clean_sorted:
-            return None
         k = (len(clean_sorted)-1) * (p/100.0)
         f = int(k)
         c = min(f+1, len(clean_sorted)-1)
@@ -213,13 +314,15 @@ def stats_from_list(values):
     s['p90'] = percentile(90)
     return s
 
-def recommend_threshold(sensor_key, baseline_vals, occupied_vals, kind='ultrasonic'):
+def recommend_threshold(sensor_key, baseline_vals, occupied_vals, kind='ultrasonic',
+                        baseline_stats=None, occupied_stats=None):
     """
     For LDR via RC timing: baseline = bright (small time), occupied = dark (large time)
     Recommendation: midpoint between medians unless overlap -> occupied_p90 + margin
+    baseline_stats/occupied_stats: stats_from_list() results already computed by the caller
     """
-    b = stats_from_list(baseline_vals)
-    o = stats_from_list(occupied_vals)
+    b = baseline_stats or stats_from_list(baseline_vals)
+    o = occupied_stats or stats_from_list(occupied_vals)
     if not b or not o:
         return None, "Insufficient data"
 
@@ -252,13 +355,21 @@ def recommend_threshold(sensor_key, baseline_vals, occupied_vals, kind='ultrason
     return None, "Unknown kind"
 
 # ----- data collection (uses read_ldr_bool for LDR) -----
-def collect_samples(sensor_key, mode, samples=DEFAULT_SAMPLES, delay=DEFAULT_DELAY):
+def collect_samples(sensor_key, mode, samples=DEFAULT_SAMPLES, delay=DEFAULT_DELAY, auto=False):
     setup_gpio()
     print(f"\nCollecting {samples} samples for {sensor_key} ({mode}) - delay {delay}s")
     print("Make sure room is in the desired state (empty / person standing in place) before starting.")
-    input("Press Enter to begin...")
+    if auto:
+        # unattended: beep through a short countdown instead of waiting for Enter
+        for remaining in range(AUTO_START_COUNTDOWN, 0, -1):
+            print(f"\aStarting in {remaining}...", flush=True)
+            time.sleep(1)
+    else:
+        input("Press Enter to begin...")
 
     recorded = []
+    # absolute deadlines on a fixed grid, so per-sample work doesn't add drift
+    next_deadline = time.monotonic()
     for i in range(samples):
         t = time.time()
         if sensor_key == 'us1':
@@ -273,35 +384,66 @@ def collect_samples(sensor_key, mode, samples=DEFAULT_SAMPLES, delay=DEFAULT_DEL
         recorded.append((t, val))
         if (i+1) % 10 == 0 or i == samples-1:
             print(f"  {i+1}/{samples}  latest={val}")
-        time.sleep(delay)
+        next_deadline += delay
+        remaining = next_deadline - time.monotonic()
+        if remaining > 0:
+            time.sleep(remaining)
+        else:
+            next_deadline -= remaining  # overran: restart the grid instead of bursting
     fn = save_csv(recorded, sensor_key, mode)
     print(f"Saved {len(recorded)} samples to {fn}")
     return fn, recorded
 
+def read_all_sensors():
+    """
+    Return (us1_cm, us2_cm, ldr_time_s). With pigpiod driving the ultrasonics the
+    LDR (RPi.GPIO) is timed in a thread meanwhile, so the pings cost no extra time.
+    """
+    ldr = []
+    ldr_thread = None
+    if pi is not None:
+        ldr_thread = Thread(target=lambda: ldr.append(measure_ldr_charge_time()), daemon=True)
+        ldr_thread.start()
+    us1 = read_ultrasonic(BEDROOM_SENSORS['us1_trigger'], BEDROOM_SENSORS['us1_echo'])
+    us2 = read_ultrasonic(BEDROOM_SENSORS['us2_trigger'], BEDROOM_SENSORS['us2_echo'])
+    if ldr_thread is None:
+        return us1, us2, measure_ldr_charge_time()
+    ldr_thread.join()
+    return us1, us2, ldr[0]
+
 # Quick single-shot logger (records LDR raw time as value)
 def quick_logger():
     setup_gpio()
     print("\nQuick logger: press Enter to capture a single reading labeled with your note.")
     print("Type 'q' + Enter to quit.")
-    while True:
-        note = input("Label (or 'q' to quit): ").strip()
-        if note.lower() == 'q':
-            break
-        t = time.time()
-        us1 = read_ultrasonic(BEDROOM_SENSORS['us1_trigger'], BEDROOM_SENSORS['us1_echo'])
-        us2 = read_ultrasonic(BEDROOM_SENSORS['us2_trigger'], BEDROOM_SENSORS['us2_echo'])
-        ldr_time = measure_ldr_charge_time()
-        fn = f"quick_log_{datetime.now().strftime('%Y%m%d')}.csv"
-        header_needed = not os.path.exists(fn)
-        with open(fn, 'a', newline='') as f:
-            w = csv.writer(f)
-            if header_needed:
-                w.writerow(['iso', 'unix', 'label', 'us1_cm', 'us2_cm', 'ldr_time_s'])
+    # the day's log stays open between captures; reopened only when the date changes
+    f = w = fn = open_date = None
+    try:
+        while True:
+            note = input("Label (or 'q' to quit): ").strip()
+            if note.lower() == 'q':
+                break
+            t = time.time()
+            us1, us2, ldr_time = read_all_sensors()
+            date = time.strftime('%Y%m%d', time.localtime(t))
+            if date != open_date:
+                if f is not None:
+                    f.close()
+                fn = f"quick_log_{date}.csv"
+                f = open(fn, 'a', newline='')
+                w = csv.writer(f)
+                open_date = date
+                if f.tell() == 0:  # new (or empty) file
+                    w.writerow(['iso', 'unix', 'label', 'us1_cm', 'us2_cm', 'ldr_time_s'])
             w.writerow([datetime.fromtimestamp(t).isoformat(), f"{t:.6f}", note,
                         "" if us1 is None else f"{us1:.2f}",
                         "" if us2 is None else f"{us2:.2f}",
                         "" if ldr_time is None else f"{ldr_time:.4f}"])
-        print(f"Logged: us1={us1}, us2={us2}, ldr_time={ldr_time} -> {fn}")
+            f.flush()  # keep the row if the session is interrupted
+            print(f"Logged: us1={us1}, us2={us2}, ldr_time={ldr_time} -> {fn}")
+    finally:
+        if f is not None:
+            f.close()
 
 # Simple analyze helper for two CSVs (or lists)
 def analyze_pair(baseline_fn_or_list, occupied_fn_or_list, sensor_key):
@@ -331,7 +473,8 @@ def analyze_pair(baseline_fn_or_list, occupied_fn_or_list, sensor_key):
     print(o_stats or "No valid occupied samples")
 
     kind = 'ldr' if sensor_key == 'ldr' else 'ultrasonic'
-    thresh, rationale = recommend_threshold(sensor_key, base_vals, occ_vals, kind=kind)
+    thresh, rationale = recommend_threshold(sensor_key, base_vals, occ_vals, kind=kind,
+                                            baseline_stats=b_stats, occupied_stats=o_stats)
     print("\nRecommendation:")
     if thresh is not None:
         if kind == 'ldr':
@@ -387,5 +530,53 @@ def menu():
     cleanup_gpio()
     print("Goodbye.")
 
+def parse_plan(plan):
+    """'baseline_us1,occupied_us1' -> [('us1', 'baseline'), ('us1', 'occupied')]"""
+    steps = []
+    for item in plan.split(','):
+        mode, _, sensor_key = item.strip().partition('_')
+        if mode not in ('baseline', 'occupied') or sensor_key not in SENSOR_KEYS:
+            raise ValueError(f"bad plan step '{item}' (expected e.g. baseline_us1)")
+        steps.append((sensor_key, mode))
+    return steps
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Sensor tuner / calibrator")
+    parser.add_argument('--sensor', choices=SENSOR_KEYS,
+                        help="collect samples for this sensor and exit (needs --mode)")
+    parser.add_argument('--mode', choices=['baseline', 'occupied'],
+                        help="room state being recorded")
+    parser.add_argument('--plan', help="comma-separated collections to run back to back, e.g. baseline_us1,occupied_us1")
+    parser.add_argument('--samples', type=int, default=DEFAULT_SAMPLES)
+    parser.add_argument('--delay', type=float, default=DEFAULT_DELAY, help="seconds between samples")
+    parser.add_argument('--auto', action='store_true',
+                        help=f"start each collection after a {AUTO_START_COUNTDOWN}s countdown instead of waiting for Enter")
+    args = parser.parse_args()
+    if (args.sensor is None) != (args.mode is None):
+        parser.error("--sensor and --mode go together")
+    if args.plan:
+        if args.sensor:
+            parser.error("use either --plan or --sensor/--mode")
+        try:
+            args.steps = parse_plan(args.plan)
+        except ValueError as e:
+            parser.error(str(e))
+    else:
+        args.steps = [(args.sensor, args.mode)] if args.sensor else []
+    if not sys.stdin.isatty() and not (args.steps and args.auto):
+        parser.error("without a terminal, give --sensor/--mode or --plan together with --auto")
+    return args
+
+def main():
+    args = parse_args()
+    if not args.steps:
+        menu()
+        return
+    try:
+        for sensor_key, mode in args.steps:
+            collect_samples(sensor_key, mode, samples=args.samples, delay=args.delay, auto=args.auto)
+    finally:
+        cleanup_gpio()
+
 if __name__ == "__main__":
-    menu()
+    main()
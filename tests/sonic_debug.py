@@ -6,6 +6,7 @@ Run with: sudo python3 ultrasonic_debug.py
 
 import time
 import sys
+from threading import Event
 
 # --- Config: change pins to your setup ---
 US1_TRIG = 23
@@ -15,6 +16,7 @@ US2_ECHO = 12
 
 # TIMEOUT must be longer than your longest expected reflection (seconds)
 TIMEOUT = 0.12
+CLOCK_CHECK_MASK = 0x3FF  # echo polls read the clock for TIMEOUT once per 1024 passes
 
 # If you have no RPi.GPIO available, the script will simulate so you can test it.
 SIMULATE = False
@@ -25,9 +27,41 @@ except Exception:
     print("RPi.GPIO not available -> running in SIMULATION MODE")
     SIMULATE = True
 
+# pigpio (if pigpiod is running) timestamps the echo edges in the daemon
+try:
+    import pigpio
+except ImportError:
+    pigpio = None
+
+pi = None
+echo_rise = {}
+echo_fall = {}
+echo_done = {}
+callbacks = []
+
+def on_echo_edge(gpio, level, tick):
+    if level == 1:
+        echo_rise[gpio] = tick
+    elif level == 0:
+        echo_fall[gpio] = tick
+        echo_done[gpio].set()
+
 def setup():
+    global pi
     if SIMULATE:
         return
+    if pigpio is not None:
+        pi = pigpio.pi()
+        if pi.connected:
+            for trig, echo in ((US1_TRIG, US1_ECHO), (US2_TRIG, US2_ECHO)):
+                pi.set_mode(trig, pigpio.OUTPUT)
+                pi.write(trig, 0)
+                pi.set_mode(echo, pigpio.INPUT)
+                echo_done[echo] = Event()
+                callbacks.append(pi.callback(echo, pigpio.EITHER_EDGE, on_echo_edge))
+            time.sleep(0.1)
+            return
+        pi = None
     GPIO.setwarnings(False)
     GPIO.setmode(GPIO.BCM)
     for pin in (US1_TRIG, US2_TRIG):
@@ -38,9 +72,57 @@ def setup():
     time.sleep(0.1)
 
 def cleanup():
-    if not SIMULATE:
+    if pi is not None:
+        for cb in callbacks:
+            cb.cancel()
+        pi.stop()
+    elif not SIMULATE:
         GPIO.cleanup()
 
+def read_distance_pigpio(trigger_pin, echo_pin, debug=False):
+    """read_distance_raw() via pigpiod: daemon-timed trigger, echo width from edge ticks (us)."""
+    echo_done[echo_pin].clear()
+    echo_rise.pop(echo_pin, None)
+    pi.gpio_trigger(trigger_pin, 10, 1)
+    if not echo_done[echo_pin].wait(2 * TIMEOUT):
+        if echo_pin in echo_rise:
+            return None, {'timed_out_wait_low': True}
+        return None, {'timed_out_wait_high': True}
+    if echo_pin not in echo_rise:
+        return None, {'timed_out_wait_high': True}
+    start, stop = echo_rise[echo_pin], echo_fall[echo_pin]
+    elapsed = pigpio.tickDiff(start, stop) / 1e6
+    distance = (elapsed * 34300) / 2.0  # cm
+    details = {'start_tick': start, 'stop_tick': stop, 'elapsed': elapsed}
+    if debug:
+        print(f"DEBUG: start_tick={start}, stop_tick={stop}, elapsed={elapsed:.6f}s")
+    return distance, details
+
+def _time_echo(echo_pin):
+    """Poll the echo edges; return (start, stop), None for a wait that timed out.
+
+    Polled rather than GPIO.wait_for_edge, whose wakeup latency lands in the timestamps.
+    The clock is read once per edge, plus a timeout check every CLOCK_CHECK_MASK + 1 polls.
+    """
+    timeout = time.monotonic() + TIMEOUT
+
+    # wait for echo HIGH
+    i = 0
+    while GPIO.input(echo_pin) == 0:
+        i += 1
+        if (i & CLOCK_CHECK_MASK) == 0 and time.monotonic() > timeout:
+            return None, None
+    start = time.monotonic()
+    timeout2 = start + TIMEOUT
+
+    # wait for echo LOW
+    i = 0
+    while GPIO.input(echo_pin) == 1:
+        i += 1
+        if (i & CLOCK_CHECK_MASK) == 0 and time.monotonic() > timeout2:
+            return start, None
+    return start, time.monotonic()
+
 def read_distance_raw(trigger_pin, echo_pin, debug=False):
     """Return (distance_cm or None, details dict). details includes start, stop, elapsed, timed_out boolean."""
     if SIMULATE:
@@ -54,6 +136,8 @@ def read_distance_raw(trigger_pin, echo_pin, debug=False):
                 return 1002.0, {'sim': True}
         else:
             return 50.0, {'sim': True}
+    if pi is not None:
+        return read_distance_pigpio(trigger_pin, echo_pin, debug)
 
     try:
         # trigger pulse
@@ -61,23 +145,11 @@ def read_distance_raw(trigger_pin, echo_pin, debug=False):
         time.sleep(0.00001)
         GPIO.output(trigger_pin, False)
 
-        start = time.monotonic()
-        timeout = start + TIMEOUT
-
-        # wait for echo HIGH
-        while GPIO.input(echo_pin) == 0:
-            start = time.monotonic()
-            if start > timeout:
-                return None, {'timed_out_wait_high': True}
-
-        stop = time.monotonic()
-        timeout2 = stop + TIMEOUT
-
-        # wait for echo LOW
-        while GPIO.input(echo_pin) == 1:
-            stop = time.monotonic()
-            if stop > timeout2:
-                return None, {'timed_out_wait_low': True}
+        start, stop = _time_echo(echo_pin)
+        if start is None:
+            return None, {'timed_out_wait_high': True}
+        if stop is None:
+            return None, {'timed_out_wait_low': True}
 
         elapsed = stop - start
         distance = (elapsed * 34300) / 2.0  # cm
@@ -103,9 +175,16 @@ def single_shot(sensor_name):
 def continuous(sensor_name='us2', interval=0.5):
     print("Press Ctrl+C to stop. Collecting samples...")
     try:
+        # sleep to absolute deadlines so the read time doesn't stretch the interval
+        next_deadline = time.monotonic()
         while True:
             single_shot(sensor_name)
-            time.sleep(interval)
+            next_deadline += interval
+            remaining = next_deadline - time.monotonic()
+            if remaining > 0:
+                time.sleep(remaining)
+            else:
+                next_deadline -= remaining  # overran: restart the grid instead of bursting
     except KeyboardInterrupt:
         print("Stopping.")
 